@@ -1,38 +1,230 @@
 import hashlib
+import hmac
 import os
 import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+# PBKDF2-HMAC-SHA256 work factor for new hashes. Stored hashes carry their own
+# count, so raising this only affects new passwords (older ones are rehashed on login).
+DEFAULT_ITERATIONS = 600_000
+LEGACY_JSON = 'users.json'
+
+
+class UserStore(ABC):
+    """Maps usernames to encoded password hashes.
+
+    add() must be atomic (False if the user already exists) and update() must
+    only touch that user, so several processes can share one store.
+    """
+
+    @abstractmethod
+    def get(self, username):
+        pass
+
+    @abstractmethod
+    def add(self, username, password_hash):
+        pass
+
+    @abstractmethod
+    def update(self, username, password_hash):
+        pass
+
+    def add_many(self, items):
+        # items: iterable of (username, password_hash); existing users are kept.
+        for username, password_hash in items:
+            self.add(username, password_hash)
+
+    @abstractmethod
+    def count(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonUserStore(UserStore):
+    """The original users.json format: loaded whole at startup, rewritten whole on every change."""
+
+    def __init__(self, path=LEGACY_JSON):
+        self.path = path
+        self.users = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.users = json.load(f)
+
+    def _save(self):
+        with open(self.path, 'w') as f:
+            json.dump(self.users, f)
+
+    def get(self, username):
+        return self.users.get(username)
+
+    def add(self, username, password_hash):
+        if username in self.users:
+            return False
+        self.users[username] = password_hash
+        self._save()
+        return True
+
+    def update(self, username, password_hash):
+        if username not in self.users:
+            return False
+        self.users[username] = password_hash
+        self._save()
+        return True
+
+    def add_many(self, items):
+        for username, password_hash in items:
+            self.users.setdefault(username, password_hash)
+        self._save()
+
+    def count(self):
+        return len(self.users)
+
+
+class SqliteUserStore(UserStore):
+    """One row per user in SQLite (WAL mode); lookups use the username primary-key index.
+
+    Every change is a single-row INSERT or UPDATE, so writes cost the same at
+    any user count and concurrent writers from other processes are serialized
+    by SQLite instead of overwriting each other.
+    """
+
+    def __init__(self, path='users.db', timeout=10.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS users ('
+                          'username TEXT PRIMARY KEY, password_hash TEXT NOT NULL) WITHOUT ROWID')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID')
+
+    def get(self, username):
+        with self._lock:
+            row = self.conn.execute('SELECT password_hash FROM users WHERE username = ?', (username,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, username, password_hash):
+        with self._lock:
+            cursor = self.conn.execute('INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)',
+                                       (username, password_hash))
+        return cursor.rowcount == 1
+
+    def update(self, username, password_hash):
+        with self._lock:
+            cursor = self.conn.execute('UPDATE users SET password_hash = ? WHERE username = ?',
+                                       (password_hash, username))
+        return cursor.rowcount == 1
+
+    def add_many(self, items):
+        with self._lock:
+            self.conn.execute('BEGIN')
+            try:
+                self.conn.executemany('INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)', items)
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def migrate_json_users(json_path, store):
+    """Copy users from a users.json file into store; users already in store are kept.
+
+    Hashes are copied as they are; legacy SHA-256 hashes are upgraded on each
+    user's next login. The file itself is left alone (it may be tracked by git).
+    Returns the number of users read, or None if the file has gone away.
+    """
+    try:
+        with open(json_path, 'r') as f:
+            users = json.load(f)
+    except FileNotFoundError:
+        # Moved away since the caller looked (e.g. by an older version migrating it); nothing to copy.
+        return None
+    # INSERT OR IGNORE: another process migrating the same file at the same time is harmless.
+    store.add_many(users.items())
+    print(f"[Auth] Migrated {len(users)} users from {json_path}")
+    return len(users)
+
+
+def open_user_store(db_path):
+    # '.json' keeps the legacy whole-file store; anything else is an SQLite database.
+    if db_path.endswith('.json'):
+        return JsonUserStore(db_path)
+    store = SqliteUserStore(db_path)
+    legacy = os.path.join(os.path.dirname(os.path.abspath(db_path)), LEGACY_JSON)
+    try:
+        stat = os.stat(legacy)
+    except FileNotFoundError:
+        return store
+    # Migrate again only if users.json changed since the last migration into this database.
+    stamp = f'{stat.st_size}:{stat.st_mtime_ns}'
+    if store.get_meta('migrated:' + LEGACY_JSON) != stamp and migrate_json_users(legacy, store) is not None:
+        store.set_meta('migrated:' + LEGACY_JSON, stamp)
+    return store
+
 
 class AuthManager:
-    def __init__(self, db_path='users.json'):
+    def __init__(self, db_path='users.db', iterations=DEFAULT_ITERATIONS, store=None):
         self.db_path = db_path
-        self.users = self._load_users()
+        self.iterations = iterations
+        self.store = store or open_user_store(db_path)
         self.current_user = None
 
-    def _load_users(self):
-        if os.path.exists(self.db_path):
-            with open(self.db_path, 'r') as f:
-                return json.load(f)
-        return {}
+    def hash_password(self, password, salt=None, iterations=None):
+        """Encode as 'pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>'."""
+        iterations = iterations or self.iterations
+        salt = salt if salt is not None else os.urandom(16)
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+        return f"pbkdf2_sha256${iterations}${salt.hex()}${digest.hex()}"
 
-    def _save_users(self):
-        with open(self.db_path, 'w') as f:
-            json.dump(self.users, f)
+    def verify_password(self, password, stored):
+        if stored.startswith('pbkdf2_sha256$'):
+            _, iterations, salt, _ = stored.split('$')
+            candidate = self.hash_password(password, bytes.fromhex(salt), int(iterations))
+        else:
+            # Unsalted SHA-256 from the original users.json.
+            candidate = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(candidate, stored)
 
-    def hash_password(self, password):
-        return hashlib.sha256(password.encode()).hexdigest()
+    def _needs_rehash(self, stored):
+        return not stored.startswith('pbkdf2_sha256$') or int(stored.split('$')[1]) < self.iterations
 
     def register(self, username, password):
-        if username in self.users:
+        if self.store.get(username) is not None:
+            return False, 'User already exists.'
+        if not self.store.add(username, self.hash_password(password)):
+            # Another process registered the same name while we were hashing.
             return False, 'User already exists.'
-        self.users[username] = self.hash_password(password)
-        self._save_users()
         return True, 'Registration successful.'
 
     def login(self, username, password):
-        if username not in self.users:
+        stored = self.store.get(username)
+        if stored is None:
             return False, 'User not found.'
-        if self.users[username] != self.hash_password(password):
+        if not self.verify_password(password, stored):
             return False, 'Incorrect password.'
+        if self._needs_rehash(stored):
+            self.store.update(username, self.hash_password(password))
         self.current_user = username
         return True, 'Login successful.'
 
@@ -43,14 +235,13 @@ class AuthManager:
         return self.current_user is not None
 
     def recover_password(self, username, new_password):
-        if username not in self.users:
+        if self.store.get(username) is None:
             return False, 'User not found.'
-        self.users[username] = self.hash_password(new_password)
-        self._save_users()
+        self.store.update(username, self.hash_password(new_password))
         return True, 'Password reset successful.'
 
     def get_user_profile(self, username):
-        if username not in self.users:
+        if self.store.get(username) is None:
             return None
         return {'username': username}
 
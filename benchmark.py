@@ -0,0 +1,417 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from buffer_pool import current_rss
+from encoders import available_encoders
+from video_engine import RES_MAP, VideoEngine
+
+SOURCE_KINDS = ('solid', 'noise', 'gradient')
+SUITE_MATRIX = {'effect': [None, 'grayscale', 'invert'], 'brightness': [1.0, 1.3], 'fmt': ['mp4', 'avi']}
+QUICK_MATRIX = {'effect': [None, 'invert'], 'brightness': [1.3], 'fmt': ['mp4']}
+
+
+def _export_timed(engine, input_path, output_path, **settings):
+    # output_path must already carry the format extension so the size lookup finds it.
+    start = time.perf_counter()
+    ok = engine.export_video(input_path, output_path, quiet=True, **settings)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(output_path) if ok and os.path.exists(output_path) else 0
+    return ok, elapsed, size
+
+
+def benchmark_encoders(input_path, resolution='1080p', fmt='mp4', codecs=('libx264', 'libx265'), encoder_preset='medium'):
+    """Export input_path once per encoder backend/codec and report throughput and output size."""
+    import cv2
+    cap = cv2.VideoCapture(input_path)
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    engine = VideoEngine()
+    variants = []
+    for encoder in available_encoders():
+        if encoder == 'ffmpeg':
+            variants += [{'encoder': encoder, 'codec': codec, 'encoder_preset': encoder_preset} for codec in codecs]
+        else:
+            variants.append({'encoder': encoder})
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for variant in variants:
+            output_path = os.path.join(tmp, f"bench_{len(results)}.{fmt}")
+            ok, elapsed, size = _export_timed(engine, input_path, output_path, resolution=resolution, fmt=fmt, **variant)
+            results.append({**variant, 'ok': ok, 'seconds': elapsed, 'fps': frames / elapsed if ok and elapsed else 0,
+                            'size_bytes': size})
+    for r in results:
+        label = r['encoder'] + (f"/{r['codec']}" if 'codec' in r else '')
+        print(f"{label:<16} {r['fps']:8.1f} fps  {r['size_bytes'] / 1024:10.1f} KiB  {'ok' if r['ok'] else 'FAILED'}")
+    return results
+
+
+def benchmark_batch_sizes(input_path, batch_sizes=(1, 2, 4, 8, 16, 32), resolutions=None, effect='invert', brightness=1.2):
+    """Frames per second of export_video for each batch_size at each resolution in RES_MAP.
+
+    Uses the OpenCV encoder for every run so encoder choice does not mask the transform cost.
+    """
+    import cv2
+    cap = cv2.VideoCapture(input_path)
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    resolutions = resolutions or [res for res in RES_MAP if res != '2160p']
+    engine = VideoEngine()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for resolution in resolutions:
+            for batch_size in batch_sizes:
+                output_path = os.path.join(tmp, f"bench_{resolution}_{batch_size}.mp4")
+                ok, elapsed, size = _export_timed(engine, input_path, output_path, resolution=resolution,
+                                                  effect=effect, brightness=brightness, batch_size=batch_size,
+                                                  encoder='opencv')
+                results.append({'resolution': resolution, 'batch_size': batch_size, 'ok': ok, 'seconds': elapsed,
+                                'fps': frames / elapsed if ok and elapsed else 0})
+    print(f"{'resolution':<10}" + ''.join(f"{'K=' + str(k):>10}" for k in batch_sizes))
+    for resolution in resolutions:
+        row = [r for r in results if r['resolution'] == resolution]
+        print(f"{resolution:<10}" + ''.join(f"{r['fps']:10.1f}" for r in row))
+    return results
+
+
+def benchmark_batch_parallel(input_path, jobs=4, workers=None, resolution='720p', effect='invert'):
+    """Wall time of the same batch through the serial path and the process-pool path.
+
+    This is the speedup parallel=True actually buys on this machine; the
+    engine's own batch report can only see per-task times inside the pool.
+    """
+    engine = VideoEngine()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, parallel in (('serial', False), ('parallel', True)):
+            batch = [{'input_path': input_path, 'output_path': os.path.join(tmp, f'{mode}_{i}.mp4'),
+                      'resolution': resolution, 'effect': effect, 'encoder': 'opencv'} for i in range(jobs)]
+            start = time.perf_counter()
+            # fanout=False so both modes decode every job, as independent jobs would.
+            ok = all(engine.batch_export(batch, parallel=parallel, workers=workers, quiet=True, fanout=False))
+            results[mode] = {'ok': ok, 'seconds': time.perf_counter() - start}
+    speedup = results['serial']['seconds'] / results['parallel']['seconds'] if results['parallel']['seconds'] else 0
+    print(f"{jobs} jobs: serial {results['serial']['seconds']:.2f}s, parallel {results['parallel']['seconds']:.2f}s "
+          f"on {workers or os.cpu_count()} workers ({speedup:.2f}x speedup)")
+    return {**results, 'jobs': jobs, 'workers': workers or os.cpu_count(), 'speedup': speedup}
+
+
+def make_synthetic_source(path, kind, size, frames=48, fps=24, seed=0):
+    """Write a deterministic test clip: 'solid' colour, per-frame 'noise' or a moving 'gradient'."""
+    import cv2
+    w, h = size
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+    rng = np.random.default_rng(seed)
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+    ramp = (np.arange(w + h) * 255 // max(1, w + h - 1)).astype(np.uint8)
+    for i in range(frames):
+        if kind == 'solid':
+            frame[:] = (255, 0, 0)
+        elif kind == 'noise':
+            frame[:] = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+        elif kind == 'gradient':
+            # Diagonal ramp scrolling a few pixels per frame, one phase-shifted ramp per channel.
+            shift = i * 4
+            for c in range(3):
+                index = (np.arange(w)[None, :] + np.arange(h)[:, None] + shift + c * (w + h) // 3) % (w + h)
+                frame[..., c] = ramp[index]
+        else:
+            raise ValueError(f"Unknown source kind: {kind}")
+        out.write(frame)
+    out.release()
+    return path
+
+
+def _unique_resolutions():
+    # RES_MAP has aliases ('4k' and '2160p'); benchmark each frame size once.
+    seen = {}
+    for name, size in RES_MAP.items():
+        seen.setdefault(size, name)
+    return list(seen.values())
+
+
+class _PeakRssSampler:
+    # Polls RSS on a thread so batch runs and encoder stalls are covered, not just frame boundaries.
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def _cpu_seconds():
+    import resource
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def _measure(run, frames, output_paths):
+    cpu_start = _cpu_seconds()
+    with _PeakRssSampler() as rss:
+        start = time.perf_counter()
+        ok = run()
+        elapsed = time.perf_counter() - start
+    cpu = _cpu_seconds() - cpu_start
+    size = sum(os.path.getsize(p) for p in output_paths if os.path.exists(p))
+    return {'ok': ok, 'seconds': elapsed, 'fps': frames / elapsed if ok and elapsed else 0,
+            'peak_rss': rss.peak, 'cpu_percent': 100 * cpu / elapsed if elapsed else 0, 'size_bytes': size}
+
+
+def _environment():
+    import platform
+    import subprocess
+    import cv2
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+            'opencv': cv2.__version__, 'numpy': np.__version__, 'cpu_count': os.cpu_count(),
+            'encoders': available_encoders(), 'time': time.time()}
+
+
+def run_suite(output_json='bench_results.json', resolutions=None, kinds=SOURCE_KINDS, matrix=None, frames=48,
+              target='720p', encoder='opencv', repeats=1, sources_dir=None):
+    """Benchmark export_video and batch_export on synthetic sources and save the results as JSON.
+
+    Each source (kind x resolution) is exported once per combination in
+    matrix (effect x brightness x fmt) to `target`, then the whole matrix runs
+    again as one serial batch_export. Every case reports fps, peak RSS, CPU use
+    and output size; with repeats > 1 the run with the median time is kept.
+    The OpenCV encoder is the default so results do not depend on ffmpeg being
+    installed. Sources are deterministic and reused from sources_dir if given.
+    """
+    import itertools
+    resolutions = resolutions or _unique_resolutions()
+    matrix = matrix or SUITE_MATRIX
+    combos = [dict(zip(matrix, values)) for values in itertools.product(*matrix.values())]
+    engine = VideoEngine()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        sources_dir = sources_dir or os.path.join(tmp, 'sources')
+        os.makedirs(sources_dir, exist_ok=True)
+        for resolution in resolutions:
+            size = RES_MAP[resolution]
+            for kind in kinds:
+                source = os.path.join(sources_dir, f"{kind}_{size[0]}x{size[1]}_{frames}.mp4")
+                if not os.path.exists(source):
+                    make_synthetic_source(source, kind, size, frames)
+                cases = []
+                for combo in combos:
+                    job = {'input_path': source, 'resolution': target, 'encoder': encoder, 'quiet': True, **combo}
+                    cases.append(('export', combo, [job]))
+                cases.append(('batch', {}, [{'input_path': source, 'resolution': target, 'encoder': encoder, **combo}
+                                            for combo in combos]))
+                for mode, combo, jobs in cases:
+                    case_id = '/'.join([mode, kind, resolution] + [str(v) for v in combo.values()])
+                    runs = []
+                    for _ in range(max(1, repeats)):
+                        for n, job in enumerate(jobs):
+                            job['output_path'] = os.path.join(tmp, f"out_{n}.{job['fmt']}")
+                        paths = [job['output_path'] for job in jobs]
+                        if mode == 'export':
+                            run = lambda: engine.export_video(**jobs[0])
+                        else:
+                            run = lambda: all(engine.batch_export(jobs, quiet=True, cache=False))
+                        runs.append(_measure(run, frames * len(jobs), paths))
+                    runs.sort(key=lambda r: r['seconds'])
+                    results.append({'id': case_id, 'mode': mode, 'kind': kind, 'source_resolution': resolution,
+                                    'target': target, **combo, **runs[len(runs) // 2]})
+                    r = results[-1]
+                    print(f"{case_id:<48} {r['fps']:8.1f} fps {r['peak_rss'] / 2**20:8.1f} MiB "
+                          f"{r['cpu_percent']:6.0f}% CPU {r['size_bytes'] / 1024:10.1f} KiB {'ok' if r['ok'] else 'FAILED'}")
+    report = {'environment': _environment(),
+              'settings': {'frames': frames, 'target': target, 'encoder': encoder, 'repeats': repeats,
+                           'matrix': matrix, 'kinds': list(kinds), 'resolutions': resolutions},
+              'results': results}
+    with open(output_json, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output_json}")
+    return report
+
+
+def compare_results(baseline_json, current_json, threshold=0.10):
+    """Compare two run_suite files case by case and return the regressions.
+
+    A case regresses when fps drops, or peak RSS or output size grows, by
+    more than threshold (a fraction), or when it fails now but passed before.
+    """
+    with open(baseline_json) as f:
+        baseline = {r['id']: r for r in json.load(f)['results']}
+    with open(current_json) as f:
+        current = {r['id']: r for r in json.load(f)['results']}
+    regressions = []
+    for case_id, new in current.items():
+        old = baseline.get(case_id)
+        if not old:
+            continue
+        changes = []
+        if old['ok'] and not new['ok']:
+            changes.append('now fails')
+        for key, worse in (('fps', -1), ('peak_rss', 1), ('size_bytes', 1)):
+            if old[key] and new['ok']:
+                delta = (new[key] - old[key]) / old[key]
+                if delta * worse > threshold:
+                    changes.append(f"{key} {delta:+.1%}")
+        if changes:
+            regressions.append({'id': case_id, 'changes': changes, 'baseline': old, 'current': new})
+        print(f"{case_id:<48} {old['fps']:8.1f} -> {new['fps']:8.1f} fps  " + (', '.join(changes) or 'ok'))
+    missing = sorted(set(baseline) - set(current))
+    if missing:
+        print(f"{len(missing)} baseline cases not in the current run")
+    print(f"{len(regressions)} regressions (threshold {threshold:.0%})")
+    return regressions
+
+
+def benchmark_auth(counts=(10_000, 100_000), backends=('sqlite', 'json'), samples=30, iterations=None):
+    """Startup, login and register latency of AuthManager with `count` existing users per backend.
+
+    login/register include the password KDF; lookup/write time the store alone
+    (store.get / store.add with a precomputed hash), which is where the
+    backends differ. Latencies are p50/p95 in milliseconds.
+    """
+    import random
+    from auth import DEFAULT_ITERATIONS, AuthManager, JsonUserStore, SqliteUserStore
+    iterations = iterations or DEFAULT_ITERATIONS
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        hasher = AuthManager(os.path.join(tmp, 'hasher.json'), iterations)
+        password_hash = hasher.hash_password('password')
+        for backend in backends:
+            for count in counts:
+                path = os.path.join(tmp, f"users_{backend}_{count}.{'json' if backend == 'json' else 'db'}")
+                store = JsonUserStore(path) if backend == 'json' else SqliteUserStore(path)
+                store.add_many((f'user{i}', password_hash) for i in range(count))
+                store.close()
+                start = time.perf_counter()
+                auth = AuthManager(path, iterations)
+                startup = time.perf_counter() - start
+                rng = random.Random(0)
+                timings = {'lookup': [], 'login': [], 'write': [], 'register': []}
+                for n in range(samples):
+                    username = f'user{rng.randrange(count)}'
+                    for key, call in (('lookup', lambda: auth.store.get(username)),
+                                      ('login', lambda: auth.login(username, 'password')),
+                                      ('write', lambda: auth.store.add(f'bench_w{n}', password_hash)),
+                                      ('register', lambda: auth.register(f'bench_r{n}', 'password'))):
+                        start = time.perf_counter()
+                        call()
+                        timings[key].append((time.perf_counter() - start) * 1e3)
+                auth.store.close()
+                row = {'backend': backend, 'users': count, 'iterations': iterations, 'startup_ms': startup * 1e3}
+                for key, values in timings.items():
+                    values.sort()
+                    row[f'{key}_p50_ms'] = values[len(values) // 2]
+                    row[f'{key}_p95_ms'] = values[min(len(values) - 1, int(len(values) * 0.95))]
+                results.append(row)
+                print(f"{backend:<7} {count:>7} users  startup {row['startup_ms']:8.1f} ms  "
+                      f"lookup {row['lookup_p50_ms']:7.3f}/{row['lookup_p95_ms']:7.3f}  "
+                      f"write {row['write_p50_ms']:7.3f}/{row['write_p95_ms']:7.3f}  "
+                      f"login {row['login_p50_ms']:7.1f}/{row['login_p95_ms']:7.1f}  "
+                      f"register {row['register_p50_ms']:7.1f}/{row['register_p95_ms']:7.1f} ms (p50/p95)")
+    return results
+
+
+def _parse_importtime(stderr):
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"; keep top-level imports.
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            modules[name.strip()] = int(cumulative) / 1e6
+    return modules
+
+
+def benchmark_startup(runs=5, script='sackbot.py', top=10, output_json=None):
+    """Cold-start timing of the GUI: medians over `runs` fresh interpreters.
+
+    Each run starts `python -X importtime <script> --startup-report` on the
+    offscreen Qt platform. wall_s is process start to exit, first_window_s is
+    script start to the first event-loop turn after show(), and modules lists
+    the slowest top-level imports (cumulative seconds).
+    """
+    import statistics
+    import subprocess
+    import sys
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime', script, '--startup-report'],
+                              capture_output=True, text=True, env=env, timeout=120)
+        wall = time.perf_counter() - start
+        report = next((json.loads(line) for line in reversed(proc.stdout.splitlines()) if line.startswith('{')), None)
+        if proc.returncode != 0 or report is None:
+            print(f"[Benchmark] Startup run failed: {proc.stderr.strip().splitlines()[-1:]}")
+            return None
+        samples.append({'wall': wall, **report, 'modules': _parse_importtime(proc.stderr)})
+    modules = {name: statistics.median(s['modules'].get(name, 0.0) for s in samples) for name in samples[0]['modules']}
+    result = {'runs': runs,
+              'wall_s': statistics.median(s['wall'] for s in samples),
+              'imports_s': statistics.median(s['imports'] for s in samples),
+              'first_window_s': statistics.median(s['first_window'] for s in samples),
+              'heavy_modules_loaded': samples[0]['heavy_modules_loaded'],
+              'modules': dict(sorted(modules.items(), key=lambda item: -item[1])[:top]),
+              'environment': _environment()}
+    print(f"wall {result['wall_s'] * 1e3:.0f} ms, first window {result['first_window_s'] * 1e3:.0f} ms "
+          f"(imports {result['imports_s'] * 1e3:.0f} ms); heavy modules at first window: "
+          f"{', '.join(result['heavy_modules_loaded']) or 'none'}")
+    for name, seconds in result['modules'].items():
+        print(f"  {name:<30} {seconds * 1e3:8.1f} ms")
+    if output_json:
+        with open(output_json, 'w') as f:
+            json.dump(result, f, indent=2)
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else 'encoders'
+    if command == 'suite':
+        # suite [output.json] [--quick]
+        args = [a for a in sys.argv[2:] if not a.startswith('--')]
+        if '--quick' in sys.argv:
+            run_suite(args[0] if args else 'bench_results.json', resolutions=['480p', '720p'], matrix=QUICK_MATRIX,
+                      frames=24, repeats=3)
+        else:
+            run_suite(args[0] if args else 'bench_results.json')
+    elif command == 'auth':
+        # auth [iterations]
+        benchmark_auth(iterations=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    elif command == 'startup':
+        # startup [runs] [output.json]
+        benchmark_startup(int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+                          output_json=sys.argv[3] if len(sys.argv) > 3 else None)
+    elif command == 'compare':
+        # compare baseline.json current.json [threshold]; exits 1 on regressions
+        threshold = float(sys.argv[4]) if len(sys.argv) > 4 else 0.10
+        sys.exit(1 if compare_results(sys.argv[2], sys.argv[3], threshold) else 0)
+    else:
+        input_path = sys.argv[2] if len(sys.argv) > 2 else 'input.mp4'
+        if command == 'batch-sizes':
+            benchmark_batch_sizes(input_path)
+        elif command == 'batch-parallel':
+            # batch-parallel [input.mp4] [jobs]
+            benchmark_batch_parallel(input_path, int(sys.argv[3]) if len(sys.argv) > 3 else 4)
+        else:
+            benchmark_encoders(input_path, resolution=sys.argv[3] if len(sys.argv) > 3 else '1080p')
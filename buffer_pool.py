@@ -0,0 +1,55 @@
+import os
+import queue
+
+import numpy as np
+
+
+class FrameBufferPool:
+    """Fixed set of preallocated frame buffers that are handed out and returned explicitly.
+
+    acquire() blocks while every buffer is in use, so the pool size also bounds
+    how many frames can be in flight.
+    """
+
+    def __init__(self, shape, count, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.count = count
+        self._free = queue.Queue()
+        for _ in range(count):
+            self._free.put(np.empty(self.shape, dtype=dtype))
+        self.nbytes = count * int(np.prod(self.shape)) * np.dtype(dtype).itemsize
+
+    def acquire(self, timeout=None):
+        return self._free.get(timeout=timeout)
+
+    def release(self, buffer):
+        self._free.put(buffer)
+
+
+def current_rss():
+    """Resident set size of this process in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakMemoryTracker:
+    # Samples RSS every `every` frames; reading /proc per frame would cost more than it tells.
+    def __init__(self, every=16):
+        self.every = every
+        self.start_rss = current_rss()
+        self.peak_rss = self.start_rss
+        self._frames = 0
+
+    def sample(self, force=False):
+        self._frames += 1
+        if force or self._frames % self.every == 0:
+            self.peak_rss = max(self.peak_rss, current_rss())
+
+    def report(self):
+        self.sample(force=True)
+        return {'start_rss': self.start_rss, 'peak_rss': self.peak_rss,
+                'peak_growth': self.peak_rss - self.start_rss}
@@ -0,0 +1,146 @@
+import cv2
+import numpy as np
+
+# name -> (function, fusable, pointwise). Fusable effects map a uint8 lookup table to
+# a new one (values in, values out) so any run of them folds into a single cv2.LUT pass.
+# Whole-frame effects take a full BGR frame plus an optional dst buffer and return the
+# result; pointwise ones only look at one pixel at a time, so a stack of frames can be
+# processed as one tall image.
+EFFECTS = {}
+
+IDENTITY_LUT = np.arange(256, dtype=np.uint8)
+
+
+def register_effect(name, fusable=True, pointwise=True):
+    def decorator(fn):
+        EFFECTS[name] = (fn, fusable, pointwise or fusable)
+        return fn
+    return decorator
+
+
+def _saturate(values):
+    return np.clip(np.rint(values), 0, 255).astype(np.uint8)
+
+
+@register_effect('invert')
+def invert(lut):
+    return 255 - lut
+
+
+@register_effect('brightness')
+def brightness(lut, value=1.0, beta=0.0):
+    # Matches cv2.convertScaleAbs(frame, alpha=value, beta=beta), which computes a fused
+    # multiply-add on float32 operands: exact in float64, then rounded once to float32.
+    # Plain float64 math rounds differently at some alphas (e.g. 1.1, 1.3, 0.7).
+    scaled = lut * np.float64(np.float32(value)) + np.float64(np.float32(beta))
+    return _saturate(np.abs(scaled.astype(np.float32)))
+
+
+@register_effect('contrast')
+def contrast(lut, value=1.0, pivot=128.0):
+    return _saturate((lut.astype(np.float64) - pivot) * value + pivot)
+
+
+@register_effect('gamma')
+def gamma(lut, value=1.0):
+    return _saturate(255.0 * (lut.astype(np.float64) / 255.0) ** (1.0 / value))
+
+
+@register_effect('levels')
+def levels(lut, in_black=0, in_white=255, value=1.0, out_black=0, out_white=255):
+    # in_*/out_* may be scalars or per-channel (B, G, R) triples.
+    v = lut.astype(np.float64)
+    if v.ndim == 1 and any(np.ndim(p) for p in (in_black, in_white, out_black, out_white)):
+        v = np.repeat(v[:, None], 3, axis=1)
+    in_black, in_white = np.asarray(in_black, np.float64), np.asarray(in_white, np.float64)
+    out_black, out_white = np.asarray(out_black, np.float64), np.asarray(out_white, np.float64)
+    norm = np.clip((v - in_black) / np.maximum(in_white - in_black, 1), 0, 1) ** (1.0 / value)
+    return _saturate(out_black + norm * (out_white - out_black))
+
+
+_GRAY_MATRIX = np.array([[0.114, 0.587, 0.299]] * 3, dtype=np.float32)
+
+
+@register_effect('grayscale', fusable=False, pointwise=True)
+def grayscale(frame, dst=None):
+    # Single cv2.transform pass with BT.601 luma weights instead of a BGR->GRAY->BGR round trip.
+    return cv2.transform(frame, _GRAY_MATRIX, dst=dst)
+
+
+def parse_effects(effect=None, brightness=1.0):
+    """Normalize export_video's effect/brightness arguments into [(name, params), ...].
+
+    effect may be None, a name, a dict with a 'name' key plus parameters, or a
+    list of those. brightness is appended last, matching the original ordering.
+    """
+    if effect is None:
+        specs = []
+    elif isinstance(effect, (list, tuple)):
+        specs = list(effect)
+    else:
+        specs = [effect]
+    chain = []
+    for spec in specs:
+        if isinstance(spec, dict):
+            params = dict(spec)
+            name = str(params.pop('name', '')).lower()
+        else:
+            name, params = str(spec).lower(), {}
+        if name in ('', 'none'):
+            continue
+        if name not in EFFECTS:
+            print(f"[Effects] Unknown effect ignored: {name}")
+            continue
+        chain.append((name, params))
+    if brightness != 1.0:
+        chain.append(('brightness', {'value': float(brightness)}))
+    return chain
+
+
+class EffectChain:
+    def __init__(self, stages):
+        # stages: [('lut', table) | ('frame', fn, params, name)]
+        self.stages = stages
+        self.pointwise = all(stage[0] == 'lut' or EFFECTS[stage[3]][2] for stage in stages)
+
+    @property
+    def passes(self):
+        return len(self.stages)
+
+    def is_identity(self):
+        return not self.stages
+
+    def apply(self, frame, dst=None):
+        for stage in self.stages:
+            if stage[0] == 'lut':
+                frame = cv2.LUT(frame, stage[1], dst=dst)
+            else:
+                frame = stage[1](frame, dst=dst, **stage[2])
+        return frame
+
+    def describe(self):
+        return ' -> '.join('lut' if stage[0] == 'lut' else stage[3] for stage in self.stages) or 'identity'
+
+
+def _as_cv_lut(lut):
+    if lut.ndim == 2:
+        return np.ascontiguousarray(lut.reshape(1, 256, 3))
+    return lut
+
+
+def compile_effects(effect=None, brightness=1.0):
+    """Fold each run of fusable effects into one 256-entry LUT (per channel if needed)."""
+    stages = []
+    lut = None
+    for name, params in parse_effects(effect, brightness):
+        fn, fusable, _ = EFFECTS[name]
+        if fusable:
+            lut = fn(IDENTITY_LUT if lut is None else lut, **params)
+            continue
+        if lut is not None and not np.array_equal(lut, IDENTITY_LUT):
+            stages.append(('lut', _as_cv_lut(lut)))
+        lut = None
+        stages.append(('frame', fn, params, name))
+    if lut is not None and not np.array_equal(lut, IDENTITY_LUT):
+        stages.append(('lut', _as_cv_lut(lut)))
+    return EffectChain(stages)
@@ -0,0 +1,93 @@
+import os
+import shutil
+import subprocess
+
+import cv2
+import numpy as np
+
+DEFAULT_CRF = {'libx264': 23, 'libx265': 28}
+# FFV1 in .avi through OpenCV: lossless intermediates for when ffmpeg is not there to join parts by stream copy.
+LOSSLESS_EXT = 'avi'
+LOSSLESS_OPTIONS = {'encoder': 'opencv', 'fourcc': 'FFV1'}
+
+
+class OpenCVEncoder:
+    """cv2.VideoWriter with mp4v/XVID (or the given fourcc); ignores bitrate, kept as the always-available fallback."""
+    name = 'opencv'
+
+    def __init__(self, output_path, fps, size, ext, fourcc=None, **options):
+        self.output_path = output_path
+        fourcc = cv2.VideoWriter_fourcc(*(fourcc or ('XVID' if ext == 'avi' else 'mp4v')))
+        self.writer = cv2.VideoWriter(output_path, fourcc, fps, size)
+
+    def is_opened(self):
+        return self.writer.isOpened()
+
+    def write(self, frame):
+        self.writer.write(frame)
+
+    def release(self):
+        self.writer.release()
+
+
+class FFmpegPipeEncoder:
+    """Streams raw BGR frames over stdin into a local ffmpeg running libx264/libx265."""
+    name = 'ffmpeg'
+
+    def __init__(self, output_path, fps, size, ext, codec='libx264', encoder_preset='medium',
+                 crf=None, bitrate='auto', encoder_threads=0, **options):
+        self.output_path = output_path
+        w, h = size
+        cmd = [shutil.which('ffmpeg'), '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{w}x{h}', '-r', str(fps), '-i', '-',
+               '-c:v', codec, '-preset', encoder_preset, '-threads', str(encoder_threads)]
+        if bitrate not in (None, 'auto'):
+            cmd += ['-b:v', str(bitrate)]
+        else:
+            cmd += ['-crf', str(crf if crf is not None else DEFAULT_CRF.get(codec, 23))]
+        if codec == 'libx265':
+            cmd += ['-x265-params', 'log-level=error']
+            if ext == 'mp4':
+                cmd += ['-tag:v', 'hvc1']
+        cmd += ['-pix_fmt', 'yuv420p', output_path]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def is_opened(self):
+        return self.proc.poll() is None
+
+    def write(self, frame):
+        self.proc.stdin.write(np.ascontiguousarray(frame).data)
+
+    def release(self):
+        if self.proc.stdin and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self.proc.returncode} for {self.output_path}")
+
+
+ENCODERS = {'opencv': OpenCVEncoder, 'ffmpeg': FFmpegPipeEncoder}
+
+
+def available_encoders():
+    return [name for name in ENCODERS if name != 'ffmpeg' or shutil.which('ffmpeg')]
+
+
+def resolve_encoder(encoder='auto'):
+    if encoder == 'auto':
+        return 'ffmpeg' if shutil.which('ffmpeg') else 'opencv'
+    if encoder not in ENCODERS:
+        raise ValueError(f"Unknown encoder backend: {encoder}")
+    if encoder == 'ffmpeg' and not shutil.which('ffmpeg'):
+        print("[Encoders] ffmpeg not found on PATH, falling back to OpenCV VideoWriter")
+        return 'opencv'
+    return encoder
+
+
+def open_encoder(output_path, fps, size, ext, encoder='auto', **options):
+    encoder = ENCODERS[resolve_encoder(encoder)](output_path, fps, size, ext, **options)
+    if not encoder.is_opened():
+        raise IOError(f"Failed to open {encoder.name} encoder for {os.path.basename(output_path)}")
+    return encoder
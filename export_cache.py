@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+# Part of every cache key. Bump it with any change that alters rendered pixels
+# (effect math, resize choices, encoder settings) so older renders are not served.
+CACHE_VERSION = 3
+
+# Job options that only affect how an export runs, never the pixels it produces.
+RUNTIME_OPTIONS = {'input_path', 'output_path', 'progress_callback', 'live_preview', 'segments', 'workers',
+                   'pipeline', 'transform_workers', 'queue_size', 'quiet', 'progress_sinks', 'progress_log',
+                   'progress_interval', 'batch_size', 'max_batch_bytes', 'resumable', 'checkpoint_frames',
+                   'profile', 'preview_fps', 'preview_width'}
+
+
+def fingerprint_input(path, samples=16, sample_size=64 * 1024):
+    """Cheap identity for a source file: size, mtime and a hash of evenly spaced samples."""
+    stat = os.stat(path)
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        if stat.st_size <= samples * sample_size:
+            sha.update(f.read())
+        else:
+            step = (stat.st_size - sample_size) // (samples - 1)
+            for i in range(samples):
+                f.seek(i * step)
+                sha.update(f.read(sample_size))
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sample_sha256': sha.hexdigest()}
+
+
+def default_cache_dir():
+    """$SACKBOT_CACHE_DIR, else a per-user cache folder (never the current directory)."""
+    if os.environ.get('SACKBOT_CACHE_DIR'):
+        return os.environ['SACKBOT_CACHE_DIR']
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'sackbot', 'exports')
+
+
+class ExportCache:
+    """Persistent, size-bounded (LRU) store of rendered outputs keyed by input + job parameters."""
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        cache_dir = cache_dir or default_cache_dir()
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.hits = 0
+        self.misses = 0
+        self._fingerprints = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                print(f"[ExportCache] Corrupt index, starting empty: {self.index_path}")
+        return {}
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _fingerprint(self, path):
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self._fingerprints:
+            self._fingerprints[memo_key] = fingerprint_input(path)
+        return self._fingerprints[memo_key]
+
+    def job_key(self, job, normalize):
+        """Return the cache key for job, or None if the input cannot be fingerprinted.
+
+        normalize(job) must return the job's output-affecting parameters in
+        canonical form (resolved resolution, parsed effect chain, encoder...).
+        """
+        try:
+            fingerprint = self._fingerprint(job['input_path'])
+        except (KeyError, OSError):
+            return None
+        import cv2
+        params = {k: v for k, v in normalize(job).items() if k not in RUNTIME_OPTIONS}
+        # The OpenCV build decides the decoder, resize kernels and mp4v/XVID encoder output.
+        payload = json.dumps({'version': CACHE_VERSION, 'opencv': cv2.__version__, 'input': fingerprint,
+                              'params': params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def lookup(self, key):
+        entry = self.index.get(key)
+        if entry:
+            path = os.path.join(self.cache_dir, entry['file'])
+            if os.path.exists(path) and os.path.getsize(path) == entry['size']:
+                entry['last_used'] = time.time()
+                self._save_index()
+                self.hits += 1
+                return path
+            del self.index[key]
+            self._save_index()
+        self.misses += 1
+        return None
+
+    def materialize(self, key, cached_path, output_path):
+        """Put the cached render at output_path; returns 'skipped' if it is already there."""
+        entry = self.index[key]
+        stat = os.stat(output_path) if os.path.exists(output_path) else None
+        recorded = entry.get('outputs', {}).get(os.path.abspath(output_path))
+        if stat and recorded == [stat.st_size, stat.st_mtime_ns]:
+            return 'skipped'
+        shutil.copyfile(cached_path, output_path)
+        self._record_output(entry, output_path)
+        self._save_index()
+        return 'copied'
+
+    def store(self, key, output_path, input_path=None):
+        ext = os.path.splitext(output_path)[1]
+        file_name = key + ext
+        shutil.copyfile(output_path, os.path.join(self.cache_dir, file_name))
+        entry = {'file': file_name, 'size': os.path.getsize(output_path), 'last_used': time.time(),
+                 'input_path': os.path.abspath(input_path) if input_path else None, 'outputs': {}}
+        self._record_output(entry, output_path)
+        self.index[key] = entry
+        self._evict()
+        self._save_index()
+
+    def _record_output(self, entry, output_path):
+        stat = os.stat(output_path)
+        entry.setdefault('outputs', {})[os.path.abspath(output_path)] = [stat.st_size, stat.st_mtime_ns]
+
+    def _evict(self):
+        total = sum(entry['size'] for entry in self.index.values())
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= entry['size']
+
+    def _remove(self, key):
+        entry = self.index.pop(key)
+        try:
+            os.remove(os.path.join(self.cache_dir, entry['file']))
+        except OSError:
+            pass
+
+    def invalidate(self, input_path=None):
+        """Drop every entry, or only those rendered from input_path. Returns the count removed."""
+        target = os.path.abspath(input_path) if input_path else None
+        keys = [key for key, entry in self.index.items() if target is None or entry.get('input_path') == target]
+        for key in keys:
+            self._remove(key)
+        self._save_index()
+        return len(keys)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.index),
+                'bytes': sum(entry['size'] for entry in self.index.values())}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Inspect or invalidate the Sackbot export cache.')
+    parser.add_argument('command', choices=['stats', 'invalidate'])
+    parser.add_argument('input_path', nargs='?', help='only invalidate renders of this input')
+    parser.add_argument('--dir', help='cache directory (default: $SACKBOT_CACHE_DIR or the per-user cache folder)')
+    args = parser.parse_args()
+    cache = ExportCache(args.dir)
+    if args.command == 'invalidate':
+        print(f"Removed {cache.invalidate(args.input_path)} cached exports")
+    else:
+        print(cache.stats())
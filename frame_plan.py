@@ -0,0 +1,211 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+FIT_MODES = ('stretch', 'letterbox')
+
+
+class FramePlan:
+    """Per-job list of frame operations chosen from source size, target size and effects.
+
+    Decisions made here:
+    - resizes that would not change the frame are dropped;
+    - the effect chain runs on whichever side of the resize has fewer pixels;
+    - INTER_AREA is used when shrinking and INTER_LINEAR when enlarging;
+    - fit='letterbox' keeps the aspect ratio and pads the rest with pad_color
+      (effects never touch the padding).
+
+    apply() writes each intermediate into a per-thread scratch buffer that is
+    reused for every frame, and the final result into `out` when given. Without
+    `out` the returned frame is only valid until the next apply() on that thread.
+
+    Setting `profiler` (a profiler.StageProfiler) times every op under its name.
+    """
+
+    def __init__(self, src_size, target_size, chain, fit='stretch', pad_color=(0, 0, 0)):
+        if fit not in FIT_MODES:
+            raise ValueError(f"Unknown fit mode: {fit}")
+        self.src_size = tuple(src_size)
+        self.target_size = tuple(target_size)
+        self.chain = chain
+        self.fit = fit
+        self.pad_color = tuple(pad_color)
+        self.ops = self._build()
+        self._local = threading.local()
+        self.profiler = None
+
+    def _build(self):
+        sw, sh = self.src_size
+        tw, th = self.target_size
+        if self.fit == 'letterbox' and sw and sh:
+            scale = min(tw / sw, th / sh)
+            cw, ch = max(1, round(sw * scale)), max(1, round(sh * scale))
+        else:
+            cw, ch = tw, th
+        ops = []
+        resize = None
+        if (cw, ch) != (sw, sh):
+            interp = cv2.INTER_AREA if cw * ch < sw * sh else cv2.INTER_LINEAR
+            resize = ('resize', (cw, ch), interp)
+        effects = None if self.chain.is_identity() else ('effects', self.chain)
+        if resize and effects and sw * sh < cw * ch:
+            ops += [effects, resize]
+        else:
+            ops += [op for op in (resize, effects) if op]
+        if (cw, ch) != (tw, th):
+            top, left = (th - ch) // 2, (tw - cw) // 2
+            ops.append(('pad', (top, th - ch - top, left, tw - cw - left)))
+        return ops
+
+    def apply(self, frame, out=None):
+        if (frame.shape[1], frame.shape[0]) != self.src_size:
+            # Container metadata lied about the size; re-plan for the real frames.
+            self.src_size = (frame.shape[1], frame.shape[0])
+            self.ops = self._build()
+            self._local = threading.local()
+        if not self.ops:
+            if out is None:
+                return frame
+            np.copyto(out, frame)
+            return out
+        scratch = getattr(self._local, 'scratch', None)
+        if scratch is None:
+            scratch = self._local.scratch = [None] * len(self.ops)
+        profiler = self.profiler
+        last = len(self.ops) - 1
+        for i, op in enumerate(self.ops):
+            into_out = i == last and out is not None
+            dst = out if into_out else scratch[i]
+            if profiler:
+                start = time.perf_counter()
+            if op[0] == 'resize':
+                frame = cv2.resize(frame, op[1], dst=dst, interpolation=op[2])
+            elif op[0] == 'effects':
+                frame = op[1].apply(frame, dst=dst)
+            else:
+                top, bottom, left, right = op[1]
+                frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                                           dst=dst, value=self.pad_color)
+            if profiler:
+                profiler.record(op[0], start)
+            if not into_out:
+                # OpenCV allocates on the first frame (or on a shape change); keep that buffer.
+                scratch[i] = frame
+        return frame
+
+    def apply_block(self, block, count, out):
+        """Apply the plan to block[:count], a (K, H, W, 3) stack of frames, writing out[:count].
+
+        Pointwise effect chains run once over the whole stack viewed as a single
+        (count*H, W, 3) image. Resizes and padding stay per frame: cv2.resize on
+        a channel-stacked block is several times slower than K separate calls.
+        """
+        if (block.shape[2], block.shape[1]) != self.src_size:
+            self.src_size = (block.shape[2], block.shape[1])
+            self.ops = self._build()
+            self._local = threading.local()
+        if not self.ops:
+            np.copyto(out[:count], block[:count])
+            return out
+        scratch = getattr(self._local, 'block_scratch', None)
+        if scratch is None or scratch[0] != len(block):
+            scratch = self._local.block_scratch = (len(block), [None] * len(self.ops))
+        buffers = scratch[1]
+        profiler = self.profiler
+        last = len(self.ops) - 1
+        cur = block
+        for i, op in enumerate(self.ops):
+            if i == last:
+                dst = out
+            else:
+                if op[0] == 'resize':
+                    shape = (len(block), op[1][1], op[1][0], 3)
+                elif op[0] == 'pad':
+                    shape = (len(block), self.target_size[1], self.target_size[0], 3)
+                else:
+                    shape = cur.shape
+                if buffers[i] is None or buffers[i].shape != shape:
+                    buffers[i] = np.empty(shape, dtype=np.uint8)
+                dst = buffers[i]
+            if profiler:
+                start = time.perf_counter()
+            if op[0] == 'effects' and op[1].pointwise:
+                h, w = cur.shape[1:3]
+                src_view = cur[:count].reshape(count * h, w, 3)
+                dst_view = dst[:count].reshape(count * h, w, 3)
+                result = op[1].apply(src_view, dst=dst_view)
+                if result is not dst_view:
+                    np.copyto(dst_view, result)
+            else:
+                for k in range(count):
+                    if op[0] == 'resize':
+                        cv2.resize(cur[k], op[1], dst=dst[k], interpolation=op[2])
+                    elif op[0] == 'effects':
+                        result = op[1].apply(cur[k], dst=dst[k])
+                        if result is not dst[k]:
+                            np.copyto(dst[k], result)
+                    else:
+                        top, bottom, left, right = op[1]
+                        cv2.copyMakeBorder(cur[k], top, bottom, left, right, cv2.BORDER_CONSTANT,
+                                           dst=dst[k], value=self.pad_color)
+            if profiler:
+                # One span per op per block; divide by the block's frame count for per-frame cost.
+                profiler.record(op[0] + '_block', start)
+            cur = dst
+        return out
+
+    def describe(self):
+        names = {cv2.INTER_AREA: 'area', cv2.INTER_LINEAR: 'linear'}
+        parts = []
+        for op in self.ops:
+            if op[0] == 'resize':
+                parts.append(f"resize {op[1][0]}x{op[1][1]} ({names.get(op[2], op[2])})")
+            elif op[0] == 'effects':
+                parts.append(f"effects [{op[1].describe()}]")
+            else:
+                parts.append("pad t{} b{} l{} r{}".format(*op[1]))
+        sw, sh = self.src_size
+        tw, th = self.target_size
+        return f"{sw}x{sh} -> {tw}x{th} {self.fit}: " + (' -> '.join(parts) or 'passthrough')
+
+
+class StaticFrameDetector:
+    """Decides whether a decoded frame can reuse the output rendered for a reference frame.
+
+    A sparse pixel grid (every sample_step-th row and column) is compared first,
+    which rejects almost every changed frame for a fraction of a full pass.
+    With tolerance 0 (strict) a grid match is confirmed by an exact full-frame
+    comparison, so output is identical to rendering every frame. A positive
+    tolerance accepts frames whose mean absolute difference on the grid, in
+    0-255 channel units, is at most that value.
+    """
+
+    def __init__(self, tolerance=0.0, sample_step=8):
+        self.tolerance = tolerance
+        self.sample_step = sample_step
+        self.checked = 0
+        self.reused = 0
+
+    def is_duplicate(self, frame, reference):
+        self.checked += 1
+        if reference is None or frame.shape != reference.shape:
+            return False
+        step = self.sample_step
+        a, b = frame[::step, ::step], reference[::step, ::step]
+        if self.tolerance:
+            duplicate = np.abs(a.astype(np.int16) - b).mean() <= self.tolerance
+        else:
+            duplicate = np.array_equal(a, b) and cv2.norm(frame, reference, cv2.NORM_INF) == 0
+        self.reused += duplicate
+        return duplicate
+
+    @property
+    def reuse_ratio(self):
+        return self.reused / self.checked if self.checked else 0.0
+
+
+def plan_frame_ops(cap, target_size, chain, fit='stretch', pad_color=(0, 0, 0)):
+    src_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    return FramePlan(src_size, target_size, chain, fit, pad_color)
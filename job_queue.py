@@ -0,0 +1,335 @@
+import heapq
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from profiler import percentile
+from video_engine import resolve_resolution, run_export_group
+
+# Keys a queue line may carry for the scheduler; everything else goes to export_video.
+SCHEDULER_KEYS = {'id', 'priority', 'memory_mb'}
+BASE_JOB_MEMORY = 150 * 2**20
+
+
+def submit(queue_path, job):
+    """Append one job to a queue file (what producers call; the daemon tails the file)."""
+    with open(queue_path, 'a') as f:
+        f.write(json.dumps(job) + '\n')
+
+
+def estimate_job_memory(job):
+    """Rough peak memory of one export in bytes, unless the job states memory_mb itself.
+
+    Counts the decoder/encoder baseline plus the frame buffers the chosen export
+    mode keeps alive at the target resolution.
+    """
+    if job.get('memory_mb'):
+        return int(job['memory_mb'] * 2**20)
+    w, h = resolve_resolution(job.get('resolution', '1080p'))
+    frame = w * h * 3
+    buffers = 8
+    if job.get('pipeline'):
+        buffers += 2 * job.get('queue_size', 8)
+    buffers += 2 * max(1, int(job.get('batch_size', 1)))
+    return BASE_JOB_MEMORY + buffers * frame
+
+
+def validate_job(job):
+    """Why the scheduler cannot take job (a dict), or None if it can."""
+    priority = job.get('priority', 0)
+    if isinstance(priority, bool) or not isinstance(priority, (int, float)):
+        return f"priority must be a number, got {priority!r}"
+    memory_mb = job.get('memory_mb')
+    if memory_mb is not None and (isinstance(memory_mb, bool) or not isinstance(memory_mb, (int, float)) or memory_mb < 0):
+        return f"memory_mb must be a non-negative number, got {memory_mb!r}"
+    try:
+        estimate_job_memory(job)
+    except (TypeError, ValueError) as e:
+        return f"cannot estimate memory: {e}"
+    return None
+
+
+def summarize(records, now=None):
+    """Queue statistics from job records (as kept by JobQueueDaemon or replayed from a status log)."""
+    now = now if now is not None else time.time()
+    states = {}
+    for record in records.values():
+        states[record['state']] = states.get(record['state'], 0) + 1
+    finished = [r for r in records.values() if r['state'] in ('done', 'failed') and r.get('finished')]
+    waits = [r['started'] - r['queued'] for r in records.values() if r.get('started') and r.get('queued')]
+    ran = [r for r in finished if r.get('started')]
+    runs = [r['finished'] - r['started'] for r in ran]
+    throughput = None
+    if ran:
+        span = max(r['finished'] for r in ran) - min(r['started'] for r in ran)
+        throughput = len(ran) / span * 60 if span > 0 else None
+    return {'queued': states.get('queued', 0), 'running': states.get('running', 0),
+            'done': states.get('done', 0), 'failed': states.get('failed', 0),
+            'jobs_per_min': throughput,
+            'wait_p50': percentile(waits, 50), 'wait_p95': percentile(waits, 95),
+            'run_p50': percentile(runs, 50), 'run_p95': percentile(runs, 95), 'time': now}
+
+
+def _apply_event(records, event):
+    record = records.setdefault(event['id'], {'state': 'queued', 'attempts': 0})
+    record['state'] = event['state']
+    if event['state'] == 'queued':
+        record['queued'] = event['time']
+    elif event['state'] == 'running':
+        record['started'] = event['time']
+        record['attempts'] += 1
+    else:
+        record['finished'] = event['time']
+    record.update({k: v for k, v in event.items() if k not in ('id', 'state', 'time')})
+
+
+def replay_status_log(status_path):
+    """Rebuild job records from a status log; a torn last line from a crash is ignored."""
+    records = {}
+    if not os.path.exists(status_path):
+        return records
+    with open(status_path, 'r') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            _apply_event(records, event)
+    return records
+
+
+class JobQueueDaemon:
+    """Headless worker that tails a JSON lines queue and runs the jobs with VideoEngine.
+
+    Each queue line is an export_video job plus optional scheduler keys: id
+    (defaults to the line number), priority (higher runs first, ties in queue
+    order) and memory_mb (overrides estimate_job_memory). Jobs run in a process
+    pool of `concurrency` workers, and a job only starts while the estimated
+    memory of the running jobs stays within max_memory_mb (one job always may).
+
+    Every state change is appended to the status log. On startup the log is
+    replayed: finished jobs are skipped, and jobs that were running when the
+    daemon died are queued again (up to max_attempts runs). With
+    checkpoint_frames set, jobs run as resumable exports, so a recovered job
+    continues from its last checkpoint.
+
+    If a worker process dies (e.g. killed for running out of memory) the pool
+    breaks and every job running in it is lost; those jobs are queued again (up
+    to max_attempts runs) and the daemon carries on with a new pool.
+    """
+
+    def __init__(self, queue_path, status_path=None, concurrency=1, max_memory_mb=None, poll_interval=1.0,
+                 checkpoint_frames=None, max_attempts=3, quiet=False):
+        self.queue_path = queue_path
+        self.status_path = status_path or queue_path + '.status.jsonl'
+        self.stats_path = self.status_path + '.stats.json'
+        self.concurrency = max(1, int(concurrency))
+        self.max_memory = max_memory_mb * 2**20 if max_memory_mb else None
+        self.poll_interval = poll_interval
+        self.checkpoint_frames = checkpoint_frames
+        self.max_attempts = max_attempts
+        self.log = (lambda *args, **kwargs: None) if quiet else print
+        self.records = {}
+        self._jobs = {}
+        self._heap = []
+        self._seq = 0
+        self._offset = 0
+        self._line_no = 0
+        self._running = {}
+        self._stopping = False
+        self._pool_broken = False
+
+    def _write_status(self, job_id, state, **fields):
+        event = {'id': job_id, 'state': state, 'time': time.time(), **fields}
+        with open(self.status_path, 'a') as f:
+            f.write(json.dumps(event) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        _apply_event(self.records, event)
+
+    def _enqueue(self, job_id, job):
+        self._jobs[job_id] = job
+        heapq.heappush(self._heap, (-job.get('priority', 0), self._seq, job_id))
+        self._seq += 1
+
+    def recover(self):
+        self.records = replay_status_log(self.status_path)
+        if os.path.exists(self.status_path) and os.path.getsize(self.status_path):
+            with open(self.status_path, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    # Terminate a line torn by a crash so the next event starts on its own line.
+                    f.write(b'\n')
+        recovered = [job_id for job_id, record in self.records.items() if record['state'] == 'running']
+        for job_id in recovered:
+            if self.records[job_id]['attempts'] >= self.max_attempts:
+                self._write_status(job_id, 'failed', ok=False, error='interrupted too many times')
+            else:
+                self.log(f"[JobQueue] Recovering interrupted job: {job_id}")
+                self._write_status(job_id, 'queued', recovered=True)
+
+    def poll_queue(self):
+        """Read lines appended since the last poll; a line without its newline yet is left for later."""
+        if not os.path.exists(self.queue_path):
+            return 0
+        with open(self.queue_path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        added = 0
+        while b'\n' in data:
+            raw, data = data.split(b'\n', 1)
+            self._offset += len(raw) + 1
+            self._line_no += 1
+            line = raw.decode('utf-8', errors='replace')
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                self._reject(f'line-{self._line_no}', f'invalid JSON: {e}')
+                continue
+            if not isinstance(job, dict):
+                self._reject(f'line-{self._line_no}', f'expected a JSON object, got {type(job).__name__}')
+                continue
+            job_id = str(job.get('id', f'line-{self._line_no}'))
+            record = self.records.get(job_id)
+            if job_id in self._jobs or (record and record['state'] in ('done', 'failed', 'running')):
+                continue
+            error = validate_job(job)
+            if error:
+                self._reject(job_id, error)
+                continue
+            if not record:
+                self._write_status(job_id, 'queued', priority=job.get('priority', 0))
+            self._enqueue(job_id, job)
+            added += 1
+        return added
+
+    def _reject(self, job_id, error):
+        # Bad lines are failed once; the queue is append-only, so they are seen again on every start.
+        if job_id not in self.records:
+            print(f"[JobQueue] Bad queue line {self._line_no}: {error}")
+            self._write_status(job_id, 'failed', ok=False, error=error)
+
+    def _running_memory(self):
+        return sum(memory for _, memory in self._running.values())
+
+    def _launch(self, pool):
+        while self._heap and len(self._running) < self.concurrency and not self._stopping:
+            job_id = self._heap[0][2]
+            job = self._jobs[job_id]
+            memory = estimate_job_memory(job)
+            if self._running and self.max_memory and self._running_memory() + memory > self.max_memory:
+                break
+            export_job = {'quiet': True, **{k: v for k, v in job.items() if k not in SCHEDULER_KEYS}}
+            if self.checkpoint_frames:
+                export_job = {'resumable': True, 'checkpoint_frames': self.checkpoint_frames, **export_job}
+            try:
+                future = pool.submit(run_export_group, [export_job], len(self.records))
+            except BrokenProcessPool:
+                # The job stays at the head of the heap for the replacement pool.
+                self._pool_broken = True
+                break
+            heapq.heappop(self._heap)
+            self._write_status(job_id, 'running')
+            self.log(f"[JobQueue] Starting {job_id} (priority {job.get('priority', 0)}, ~{memory / 2**20:.0f} MB)")
+            self._running[future] = (job_id, memory)
+
+    def _collect(self, done):
+        for future in done:
+            job_id, _ = self._running.pop(future)
+            try:
+                oks, elapsed = future.result()
+                ok, error = oks[0], None
+            except BrokenProcessPool as e:
+                # A worker died; which job it was running is unknown, so every job in the pool is retried.
+                self._pool_broken = True
+                if self.records[job_id]['attempts'] < self.max_attempts:
+                    self.log(f"[JobQueue] Worker pool broke; requeueing {job_id}")
+                    self._write_status(job_id, 'queued', recovered=True, error=str(e) or 'worker process died')
+                    self._enqueue(job_id, self._jobs[job_id])
+                    continue
+                ok, elapsed, error = False, None, f'worker process died {self.max_attempts} times'
+            except Exception as e:
+                ok, elapsed, error = False, None, str(e)
+            self._jobs.pop(job_id, None)
+            self._write_status(job_id, 'done' if ok else 'failed', ok=ok, elapsed=elapsed,
+                               **({'error': error} if error else {}))
+            self.log(f"[JobQueue] {'Finished' if ok else 'Failed'}: {job_id}")
+        self.write_stats()
+
+    def stats(self):
+        return summarize(self.records)
+
+    def write_stats(self):
+        tmp_path = self.stats_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.stats(), f, indent=2)
+        os.replace(tmp_path, self.stats_path)
+
+    def stop(self):
+        # Running jobs are allowed to finish; queued ones stay queued for the next start.
+        self._stopping = True
+
+    def run(self, once=False):
+        """Serve the queue until stop() (or, with once=True, until it has drained)."""
+        self.recover()
+        # Recovered jobs are re-read from the queue file, so the heap starts empty.
+        self.log(f"[JobQueue] Watching {self.queue_path} with {self.concurrency} workers")
+        pool = ProcessPoolExecutor(max_workers=self.concurrency)
+        try:
+            while True:
+                if self._pool_broken and not self._running:
+                    self.log("[JobQueue] Starting a new worker pool")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = ProcessPoolExecutor(max_workers=self.concurrency)
+                    self._pool_broken = False
+                if not self._stopping:
+                    self.poll_queue()
+                    self._launch(pool)
+                if self._running:
+                    done, _ = wait(list(self._running), timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    self._collect(done)
+                elif self._stopping or (once and not self._heap):
+                    break
+                else:
+                    time.sleep(self.poll_interval)
+        finally:
+            pool.shutdown()
+        self.write_stats()
+        return self.stats()
+
+
+if __name__ == "__main__":
+    import argparse
+    import signal
+    parser = argparse.ArgumentParser(description='Headless Sackbot render queue.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run_parser = sub.add_parser('run', help='process jobs from a JSON lines queue')
+    run_parser.add_argument('queue_path')
+    run_parser.add_argument('--status', help='status log (default: <queue>.status.jsonl)')
+    run_parser.add_argument('--concurrency', type=int, default=1)
+    run_parser.add_argument('--max-memory-mb', type=int)
+    run_parser.add_argument('--poll', type=float, default=1.0)
+    run_parser.add_argument('--checkpoint-frames', type=int)
+    run_parser.add_argument('--once', action='store_true', help='exit when the queue is drained')
+    submit_parser = sub.add_parser('submit', help='append a job (JSON object) to a queue')
+    submit_parser.add_argument('queue_path')
+    submit_parser.add_argument('job')
+    stats_parser = sub.add_parser('stats', help='print statistics replayed from a status log')
+    stats_parser.add_argument('status_path')
+    args = parser.parse_args()
+    if args.command == 'submit':
+        submit(args.queue_path, json.loads(args.job))
+    elif args.command == 'stats':
+        print(json.dumps(summarize(replay_status_log(args.status_path)), indent=2))
+    else:
+        daemon = JobQueueDaemon(args.queue_path, args.status, args.concurrency, args.max_memory_mb, args.poll,
+                                args.checkpoint_frames)
+        signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+        try:
+            print(json.dumps(daemon.run(once=args.once), indent=2))
+        except KeyboardInterrupt:
+            print("[JobQueue] Interrupted; running jobs will be recovered on the next start")
@@ -1,9 +1,30 @@
+import hashlib
+import json
 import os
+import struct
+import sys
+import time
 import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
-EXCLUDE = {'__pycache__', 'output_test.avi', 'input.mp4', 'users.json', 'sackbot-latest.zip', 'backup.zip'}
+EXCLUDE = {'__pycache__', 'output_test.avi', 'input.mp4', 'users.json', 'users.json.migrated', 'users.db', 'users.db-wal', 'users.db-shm', 'sackbot-latest.zip', 'backup.zip', '.sackbot_cache',
+           '.package_state.json'}
 
 PACKAGE_NAME = 'sackbot-latest.zip'
+MANIFEST_NAME = 'MANIFEST.json'
+STATE_PATH = '.package_state.json'
+# Formats that are already compressed; deflating them again costs time and saves nothing.
+STORED_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.png', '.jpg', '.jpeg', '.zip', '.gz'}
+# Python versions whose zipfile internals _write_raw has been checked against. On any
+# other version every entry is rebuilt with the public ZipFile.write instead.
+RAW_WRITE_VERSIONS = ((3, 8), (3, 13))
+_RAW_WRITE_ATTRS = ('_lock', '_writecheck', '_didModify', 'fp', 'filelist', 'NameToInfo', 'start_dir')
+
+
+def _raw_write_supported(zf):
+    low, high = RAW_WRITE_VERSIONS
+    return low <= sys.version_info[:2] <= high and all(hasattr(zf, name) for name in _RAW_WRITE_ATTRS)
 
 
 def should_include(filename):
@@ -12,18 +33,214 @@ def should_include(filename):
             return False
     return True
 
-def package_app():
-    with zipfile.ZipFile(PACKAGE_NAME, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for root, dirs, files in os.walk('.'):
-            # Skip excluded dirs
-            dirs[:] = [d for d in dirs if d not in EXCLUDE]
-            for file in files:
-                if file == PACKAGE_NAME or not should_include(file):
-                    continue
-                filepath = os.path.join(root, file)
-                arcname = os.path.relpath(filepath, '.')
-                zf.write(filepath, arcname)
-    print(f"Packaged app as {PACKAGE_NAME}")
+
+def _collect_files(root_dir='.', package_name=PACKAGE_NAME):
+    files = []
+    for root, dirs, names in os.walk(root_dir):
+        # Skip excluded dirs
+        dirs[:] = [d for d in dirs if d not in EXCLUDE]
+        for name in names:
+            if name in (package_name, package_name + '.tmp') or not should_include(name):
+                continue
+            path = os.path.join(root, name)
+            files.append((path, os.path.relpath(path, root_dir).replace(os.sep, '/')))
+    return sorted(files, key=lambda item: item[1])
+
+
+def _hash_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _compress_file(path, stored):
+    """Read path once: returns (sha256, crc32, size, deflated bytes or None when stored)."""
+    sha256 = hashlib.sha256()
+    crc = 0
+    size = 0
+    compressor = None if stored else zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    parts = []
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            if compressor:
+                parts.append(compressor.compress(chunk))
+    if compressor:
+        parts.append(compressor.flush())
+        return sha256.hexdigest(), crc, size, b''.join(parts)
+    return sha256.hexdigest(), crc, size, None
+
+
+def _write_raw(zf, zinfo, chunks):
+    # zipfile has no public API for pre-compressed data; this is what ZipFile.write
+    # does for directory entries, followed by the already-encoded payload.
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    with zf._lock:
+        zf._writecheck(zinfo)
+        zf._didModify = True
+        zinfo.header_offset = zf.fp.tell()
+        zf.fp.write(zinfo.FileHeader(zip64))
+        for chunk in chunks:
+            zf.fp.write(chunk)
+        zf.filelist.append(zinfo)
+        zf.NameToInfo[zinfo.filename] = zinfo
+        zf.start_dir = zf.fp.tell()
+
+
+def _raw_entry_data(zf, info, chunk_size=1024 * 1024):
+    # Compressed bytes of an existing entry, read straight from the archive.
+    zf.fp.seek(info.header_offset)
+    header = zf.fp.read(30)
+    if header[:4] != b'PK\x03\x04':
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    name_len, extra_len = struct.unpack('<HH', header[26:30])
+    zf.fp.seek(info.header_offset + 30 + name_len + extra_len)
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = zf.fp.read(min(chunk_size, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated entry {info.filename}")
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _file_chunks(path, chunk_size=1024 * 1024):
+    with open(path, 'rb') as f:
+        yield from iter(lambda: f.read(chunk_size), b'')
+
+
+def read_manifest(package_path):
+    with zipfile.ZipFile(package_path) as zf:
+        return json.loads(zf.read(MANIFEST_NAME))
+
+
+def package_app(root_dir='.', package_name=PACKAGE_NAME, workers=None, state_path=STATE_PATH):
+    """Build package_name incrementally from root_dir.
+
+    Files whose hash matches the previous archive's manifest have their
+    compressed entry copied over unchanged; changed files are deflated in
+    parallel (zlib releases the GIL) a few files ahead of the writer, and
+    already-compressed formats are stored as-is. MANIFEST.json inside the
+    archive lists every file's sha256 and size. File hashes are cached in
+    state_path by size and mtime, so unchanged files are not even read.
+
+    Copying and pre-compressed entries rely on zipfile internals; on Python
+    versions outside RAW_WRITE_VERSIONS every file goes through ZipFile.write.
+    """
+    start = time.perf_counter()
+    package_path = os.path.join(root_dir, package_name)
+    state_path = os.path.join(root_dir, state_path)
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+    previous = None
+    previous_manifest = {}
+    if os.path.exists(package_path):
+        try:
+            previous = zipfile.ZipFile(package_path)
+            previous_manifest = json.loads(previous.read(MANIFEST_NAME))['files']
+        except (zipfile.BadZipFile, KeyError, ValueError):
+            # Archives from before the manifest existed are rebuilt from scratch.
+            previous_manifest = {}
+
+    files = _collect_files(root_dir, package_name)
+    reuse, changed = {}, []
+    for path, arcname in files:
+        stat = os.stat(path)
+        cached = state.get(arcname)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            sha256 = cached['sha256']
+        else:
+            sha256 = None
+        old = previous_manifest.get(arcname)
+        if sha256 is None and old and old['size'] == stat.st_size:
+            # Same size as the packaged copy: worth hashing to see if the entry can be reused.
+            sha256 = _hash_file(path)
+        if old and sha256 == old['sha256']:
+            reuse[arcname] = sha256
+        else:
+            changed.append((path, arcname))
+
+    stored = {arcname: os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS for _, arcname in files}
+    workers = workers or os.cpu_count() or 1
+    manifest = {'format': 1, 'files': {}}
+    new_state = {}
+    tmp_path = package_path + '.tmp'
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zf, ThreadPoolExecutor(max_workers=workers) as pool:
+            raw = _raw_write_supported(zf)
+            if not raw:
+                print(f"[Package] Raw zip entries are not verified on Python {sys.version_info[0]}.{sys.version_info[1]}; "
+                      f"rebuilding every entry with ZipFile.write")
+                reuse, changed = {}, list(files)
+            # Compression runs at most 2 * workers files ahead of the writer, so only that
+            # many deflated files are held in memory. Without raw writes the pool only hashes.
+            queue = iter(changed)
+            futures = {}
+
+            def submit_next():
+                item = next(queue, None)
+                if item:
+                    futures[item[1]] = pool.submit(_compress_file, item[0], stored[item[1]] or not raw)
+
+            for _ in range(2 * workers):
+                submit_next()
+            for path, arcname in files:
+                stat = os.stat(path)
+                if arcname in reuse:
+                    old_info = previous.getinfo(arcname)
+                    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+                    zinfo.compress_type = old_info.compress_type
+                    zinfo.CRC, zinfo.file_size, zinfo.compress_size = old_info.CRC, old_info.file_size, old_info.compress_size
+                    _write_raw(zf, zinfo, _raw_entry_data(previous, old_info))
+                    sha256 = reuse[arcname]
+                elif not raw:
+                    sha256 = futures.pop(arcname).result()[0]
+                    submit_next()
+                    zf.write(path, arcname, zipfile.ZIP_STORED if stored[arcname] else zipfile.ZIP_DEFLATED)
+                else:
+                    sha256, crc, size, data = futures.pop(arcname).result()
+                    submit_next()
+                    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+                    zinfo.CRC, zinfo.file_size = crc, size
+                    if data is None:
+                        zinfo.compress_type, zinfo.compress_size = zipfile.ZIP_STORED, size
+                        _write_raw(zf, zinfo, _file_chunks(path))
+                    else:
+                        zinfo.compress_type, zinfo.compress_size = zipfile.ZIP_DEFLATED, len(data)
+                        _write_raw(zf, zinfo, [data])
+                manifest['files'][arcname] = {'sha256': sha256, 'size': stat.st_size, 'stored': stored[arcname]}
+                new_state[arcname] = {'sha256': sha256, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True))
+    finally:
+        if previous:
+            previous.close()
+    os.replace(tmp_path, package_path)
+    with open(state_path, 'w') as f:
+        json.dump(new_state, f)
+    print(f"Packaged app as {package_name}: {len(reuse)} reused, {len(changed)} rebuilt "
+          f"({sum(1 for _, a in changed if stored[a])} stored) in {time.perf_counter() - start:.2f}s")
+    return manifest
+
+
+def compare_packages(old_package, new_package):
+    """File-by-file difference between two packages, from their manifests."""
+    old = read_manifest(old_package)['files']
+    new = read_manifest(new_package)['files']
+    return {'added': sorted(set(new) - set(old)),
+            'removed': sorted(set(old) - set(new)),
+            'changed': sorted(name for name in set(old) & set(new) if old[name]['sha256'] != new[name]['sha256']),
+            'unchanged': len([name for name in set(old) & set(new) if old[name]['sha256'] == new[name]['sha256']])}
 
 if __name__ == "__main__":
-    package_app()
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == 'diff':
+        # diff old.zip new.zip
+        print(json.dumps(compare_packages(sys.argv[2], sys.argv[3]), indent=2))
+    else:
+        package_app()
@@ -0,0 +1,127 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from effects import compile_effects
+
+PREVIEW_WIDTH = 480
+
+
+def proxy_size(size, max_width=PREVIEW_WIDTH):
+    """(w, h) scaled down to at most max_width wide, keeping the aspect ratio (never scaled up)."""
+    w, h = size
+    if w <= max_width:
+        return w, h
+    return max_width, max(1, round(h * max_width / w))
+
+
+class PreviewSlot:
+    """Single-slot, drop-oldest hand-off of preview frames from an export to a display.
+
+    offer() never blocks: a frame the display has not taken yet is replaced by
+    the newer one (and counted in `dropped`). take() returns the latest frame
+    once, or None when nothing new arrived, so a slow display only ever sees
+    fewer frames and can never hold up the encoder.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._item = None
+        self.offered = 0
+        self.dropped = 0
+
+    def offer(self, frame_index, frame):
+        with self._lock:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = (frame_index, frame)
+            self.offered += 1
+
+    def take(self):
+        """(frame_index, frame) or None."""
+        with self._lock:
+            item, self._item = self._item, None
+        return item
+
+
+class PreviewTap:
+    """Encoder wrapper that posts a downscaled copy of every written frame to a PreviewSlot, at most max_fps times a second.
+
+    The frame is written to the real encoder first. Skipped frames cost one
+    clock read; posted ones a cv2.resize to the proxy size, which also copies
+    them out of the export's reused buffers.
+    """
+
+    def __init__(self, out, slot, max_fps=15, max_width=PREVIEW_WIDTH):
+        self.out = out
+        self.name = out.name
+        self.slot = slot
+        self.interval = 1.0 / max_fps if max_fps else 0.0
+        self.max_width = max_width
+        self.frames = 0
+        self._next = 0.0
+
+    def is_opened(self):
+        return self.out.is_opened()
+
+    def write(self, frame):
+        self.out.write(frame)
+        self.frames += 1
+        now = time.perf_counter()
+        if now < self._next:
+            return
+        self._next = now + self.interval
+        size = proxy_size((frame.shape[1], frame.shape[0]), self.max_width)
+        if size == (frame.shape[1], frame.shape[0]):
+            proxy = frame.copy()
+        else:
+            proxy = cv2.resize(frame, size, interpolation=cv2.INTER_NEAREST)
+        self.slot.offer(self.frames, proxy)
+
+    def release(self):
+        self.out.release()
+
+
+class SampledFramePreview:
+    """Before/after preview of effect and brightness settings on a few frames sampled from a video.
+
+    The samples are decoded and downscaled once; render() only runs the
+    compiled effect chain on a proxy-sized frame, which takes a millisecond or
+    two, so it can follow a slider as it moves. Compiled chains are cached per
+    setting.
+    """
+
+    def __init__(self, input_path, samples=5, max_width=PREVIEW_WIDTH):
+        self.input_path = input_path
+        self.frames = []
+        self._chains = {}
+        cap = cv2.VideoCapture(input_path)
+        if not cap.isOpened():
+            print(f"[Preview] Failed to open input video: {input_path}")
+            return
+        try:
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            positions = [int(total * (i + 0.5) / samples) for i in range(samples)] if total > 0 else [0]
+            for position in positions:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+                ok, frame = cap.read()
+                if not ok:
+                    continue
+                size = proxy_size((frame.shape[1], frame.shape[0]), max_width)
+                self.frames.append(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+        finally:
+            cap.release()
+
+    def render(self, index=0, effect=None, brightness=1.0):
+        """(before, after) for sample `index`, or None if no frame could be decoded."""
+        if not self.frames:
+            return None
+        before = self.frames[index % len(self.frames)]
+        key = (effect, round(brightness, 3))
+        chain = self._chains.get(key)
+        if chain is None:
+            chain = self._chains[key] = compile_effects(effect, brightness)
+        after = before if chain.is_identity() else chain.apply(before, dst=np.empty_like(before))
+        return before, after
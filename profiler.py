@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, q, presorted=False):
+    """Nearest-rank q-th percentile of values, or None if there are none."""
+    if not len(values):
+        return None
+    values = values if presorted else sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+class StageProfiler:
+    """Per-frame timings of the render stages (decode, resize, effects, pad, encode).
+
+    The export path is only instrumented when a profiler is passed in: the
+    frame iterator and encoder are wrapped and FramePlan times its ops, so an
+    export without one runs the same code as before. Spans are kept as tuples
+    and only turned into Chrome trace events when written out.
+    """
+
+    def __init__(self, job=None, max_events=1_000_000):
+        self.job = job
+        self.max_events = max_events
+        self.origin = time.perf_counter()
+        self.durations = {}
+        self.spans = []
+        self.dropped = 0
+
+    def record(self, stage, start, end=None, frame=None):
+        end = time.perf_counter() if end is None else end
+        self.durations.setdefault(stage, []).append(end - start)
+        if len(self.spans) < self.max_events:
+            self.spans.append((stage, start, end, threading.get_ident(), frame))
+        else:
+            self.dropped += 1
+
+    def frames(self, iterator, stage='decode'):
+        """Yield from iterator, timing each next() (decoding, seeking and grabbing skipped frames)."""
+        iterator = iter(iterator)
+        idx = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                frame = next(iterator)
+            except StopIteration:
+                return
+            self.record(stage, start, frame=idx)
+            idx += 1
+            yield frame
+
+    def wrap_encoder(self, out, stage='encode'):
+        return _ProfiledEncoder(out, self, stage)
+
+    def summary(self):
+        """{stage: {count, total, mean, p50, p95, p99, histogram}}; times in seconds.
+
+        histogram counts spans per power-of-two microsecond bucket, keyed by the
+        bucket's upper bound ('<=1us', '<=2us', ...).
+        """
+        result = {}
+        for stage, values in self.durations.items():
+            ordered = sorted(values)
+            histogram = {}
+            for value in ordered:
+                bound = 1
+                while bound < value * 1e6:
+                    bound *= 2
+                histogram[f'<={bound}us'] = histogram.get(f'<={bound}us', 0) + 1
+            result[stage] = {'count': len(ordered), 'total': sum(ordered), 'mean': sum(ordered) / len(ordered),
+                             **{f'p{q}': percentile(ordered, q, presorted=True) for q in PERCENTILES}, 'histogram': histogram}
+        return result
+
+    def format_summary(self):
+        lines = [f"{'stage':<14} {'count':>7} {'total s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"]
+        for stage, s in sorted(self.summary().items(), key=lambda item: -item[1]['total']):
+            lines.append(f"{stage:<14} {s['count']:>7} {s['total']:>9.3f} {s['p50'] * 1e3:>8.2f} "
+                         f"{s['p95'] * 1e3:>8.2f} {s['p99'] * 1e3:>8.2f}")
+        return '\n'.join(lines)
+
+    def trace_events(self, pid=None):
+        pid = os.getpid() if pid is None else pid
+        threads = {}
+        events = []
+        for stage, start, end, tid, frame in self.spans:
+            tid = threads.setdefault(tid, len(threads))
+            event = {'name': stage, 'cat': 'render', 'ph': 'X', 'pid': pid, 'tid': tid,
+                     'ts': (start - self.origin) * 1e6, 'dur': (end - start) * 1e6}
+            if frame is not None:
+                event['args'] = {'frame': frame}
+            events.append(event)
+        if self.job is not None:
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': str(self.job)}})
+        return events
+
+    def write_trace(self, path):
+        """Write a Chrome trace event file (chrome://tracing, Perfetto); the summary rides along in otherData."""
+        trace = {'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms',
+                 'otherData': {'job': self.job, 'dropped_events': self.dropped, 'summary': self.summary()}}
+        with open(path, 'w') as f:
+            json.dump(trace, f)
+        return path
+
+
+class _ProfiledEncoder:
+    def __init__(self, out, profiler, stage):
+        self.out = out
+        self.name = out.name
+        self._profiler = profiler
+        self._stage = stage
+
+    def is_opened(self):
+        return self.out.is_opened()
+
+    def write(self, frame):
+        start = time.perf_counter()
+        self.out.write(frame)
+        self._profiler.record(self._stage, start)
+
+    def release(self):
+        start = time.perf_counter()
+        self.out.release()
+        self._profiler.record('encoder_flush', start)
+
+
+def merge_traces(trace_paths, output_path):
+    """Combine per-job trace files into one, each job on its own process row.
+
+    Returns {job: summary} from the merged files.
+    """
+    events = []
+    summaries = {}
+    for pid, path in enumerate(trace_paths, 1):
+        try:
+            with open(path, 'r') as f:
+                trace = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for event in trace.get('traceEvents', []):
+            events.append({**event, 'pid': pid})
+        other = trace.get('otherData', {})
+        summaries[other.get('job') or path] = other.get('summary', {})
+    with open(output_path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return summaries
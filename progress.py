@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import time
+
+
+class ProgressReporter:
+    """Throttled, structured progress for one export.
+
+    update() is cheap to call per frame; sinks only see an event when
+    `interval` seconds have passed (or `percent_step` percent, if given)
+    since the last one, plus a final event with done=True.
+    Events are plain dicts: job, frames_done, total_frames, percent, fps,
+    eta, elapsed, bytes_written, done.
+    """
+
+    def __init__(self, total_frames, sinks=(), output_path=None, job=None, interval=0.1, percent_step=None):
+        self.total_frames = total_frames
+        self.sinks = list(sinks)
+        self.output_path = output_path
+        self.job = job if job is not None else output_path
+        self.interval = interval
+        self.percent_step = percent_step
+        self.start = time.perf_counter()
+        self._last_time = None
+        self._last_percent = None
+        self.frames_done = 0
+        # Frames finished by an earlier run (resumed exports); excluded from fps/eta.
+        self.base_frames = 0
+
+    def _due(self, now, percent):
+        if self._last_time is None:
+            return True
+        if self.percent_step is not None:
+            return percent - self._last_percent >= self.percent_step
+        return now - self._last_time >= self.interval
+
+    def update(self, frames_done, force=False):
+        self.frames_done = frames_done
+        if not self.sinks:
+            return
+        now = time.perf_counter()
+        percent = (frames_done / self.total_frames) * 100 if self.total_frames else 0
+        if not (force or self._due(now, percent)):
+            return
+        self._last_time, self._last_percent = now, percent
+        self._emit(self._event(now, percent, False))
+
+    def finish(self):
+        now = time.perf_counter()
+        percent = (self.frames_done / self.total_frames) * 100 if self.total_frames else 100
+        self._emit(self._event(now, percent, True))
+
+    def _event(self, now, percent, done):
+        elapsed = now - self.start
+        fps = (self.frames_done - self.base_frames) / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total_frames - self.frames_done, 0)
+        bytes_written = 0
+        if self.output_path and os.path.exists(self.output_path):
+            bytes_written = os.path.getsize(self.output_path)
+        return {'job': self.job, 'frames_done': self.frames_done, 'total_frames': self.total_frames,
+                'percent': percent, 'fps': fps, 'eta': remaining / fps if fps else None,
+                'elapsed': elapsed, 'bytes_written': bytes_written, 'done': done}
+
+    def _emit(self, event):
+        for sink in self.sinks:
+            sink(event)
+
+
+class TerminalSink:
+    def __call__(self, event):
+        # Terminal progress bar for user POV
+        percent = event['percent']
+        bar = ('#' * int(percent // 2)).ljust(50)
+        eta = f"{event['eta']:.0f}s" if event['eta'] is not None else '--'
+        print(f"\rExporting: [{bar}] {percent:.1f}% ({event['frames_done']}/{event['total_frames']}) "
+              f"{event['fps']:.1f} fps ETA {eta}", end='')
+        if event['done']:
+            print("\nExport complete! Output saved to:", event['job'])
+
+
+class CallbackSink:
+    # Adapts the legacy progress_callback(current, total) signature.
+    def __init__(self, callback):
+        self.callback = callback
+
+    def __call__(self, event):
+        self.callback(event['frames_done'], event['total_frames'])
+
+
+class QtSignalSink(CallbackSink):
+    """Emits a pyqtSignal(int, int); only throttled events cross the thread boundary."""
+
+    def __init__(self, signal):
+        super().__init__(signal.emit)
+
+
+class JsonLinesSink:
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, event):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(event) + '\n')
+
+
+class QueueSink:
+    # Forwards (task_index, frames_done, total_frames) to a multiprocessing queue.
+    def __init__(self, queue, task_index):
+        self.queue = queue
+        self.task_index = task_index
+
+    def __call__(self, event):
+        self.queue.put((self.task_index, event['frames_done'], event['total_frames']))
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportControl:
+    """Cancel/pause switch shared between a UI thread and a running export.
+
+    The export calls checkpoint() once per frame: it blocks there while paused
+    and raises ExportCancelled once cancel() has been called.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def checkpoint(self):
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise ExportCancelled()
@@ -1,13 +1,43 @@
+import hashlib
+import json
+import os
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def build_chunk_manifest(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Manifest published next to a release so clients can fetch only the chunks that changed."""
+    chunks = []
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            chunks.append(hashlib.sha256(chunk).hexdigest())
+            sha256.update(chunk)
+    return {'size': os.path.getsize(file_path), 'chunk_size': chunk_size, 'sha256': sha256.hexdigest(), 'chunks': chunks}
+
 
 class Updater:
-    def __init__(self, version, update_url):
+    def __init__(self, version, update_url, session=None, max_workers=4, chunk_size=DEFAULT_CHUNK_SIZE):
         self.version = version
         self.update_url = update_url
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self.last_download_stats = None
+        # abspath -> (size, mtime_ns, sha256) of files hashed while downloading.
+        self._hashes = {}
 
     def check_for_update(self):
         try:
-            response = requests.get(self.update_url, timeout=5)
+            response = self.session.get(self.update_url, timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 latest_version = data.get('version')
@@ -19,18 +49,178 @@ class Updater:
         except Exception as e:
             return False, self.version, f'Error: {e}'
 
-    def download_update(self, download_url, dest_path):
+    def download_update(self, download_url, dest_path, expected_hash=None, manifest=None, base_path=None,
+                        progress_callback=None):
+        """Download to dest_path, in parallel byte ranges when the server supports them.
+
+        Chunks are written into <dest>.part as they arrive and hashed in file
+        order on the fly, so no second read is needed to verify the download.
+        <dest>.part.json records finished chunks and the server's ETag or
+        Last-Modified value, and a later call resumes from it if the file has
+        not changed on the server.
+        manifest (a dict from build_chunk_manifest, or its URL) adds per-chunk
+        checks and lets chunks whose hash matches the same chunk of base_path
+        (default: the existing dest_path) be copied locally instead of downloaded.
+        Fails if the result does not match expected_hash or the manifest hash.
+        """
+        part_path = dest_path + '.part'
+        state_path = part_path + '.json'
         try:
-            with requests.get(download_url, stream=True) as r:
-                r.raise_for_status()
-                with open(dest_path, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
+            if isinstance(manifest, str):
+                response = self.session.get(manifest, timeout=10)
+                response.raise_for_status()
+                manifest = response.json()
+            try:
+                head = self.session.head(download_url, allow_redirects=True, timeout=10)
+                head.raise_for_status()
+                headers = head.headers
+            except requests.RequestException as e:
+                # Some servers and CDNs reject HEAD; a plain GET still works there.
+                print(f"[Updater] HEAD request failed ({e}); downloading in one stream")
+                headers = {}
+            size = int(headers.get('Content-Length', 0))
+            validator = headers.get('ETag') or headers.get('Last-Modified')
+            if headers.get('Accept-Ranges') != 'bytes' or not size:
+                file_hash = self._download_stream(download_url, part_path, progress_callback)
+                stats = {'mode': 'stream', 'downloaded_bytes': os.path.getsize(part_path)}
+            else:
+                file_hash, stats = self._download_ranges(download_url, part_path, state_path, size, validator,
+                                                         manifest, base_path or dest_path, progress_callback)
+            expected = expected_hash or (manifest or {}).get('sha256')
+            if expected and file_hash != expected:
+                os.remove(part_path)
+                if os.path.exists(state_path):
+                    os.remove(state_path)
+                print(f"[Updater] Download failed: hash mismatch ({file_hash} != {expected})")
+                return False
+            os.replace(part_path, dest_path)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            stat = os.stat(dest_path)
+            self._hashes[os.path.abspath(dest_path)] = (stat.st_size, stat.st_mtime_ns, file_hash)
+            self.last_download_stats = {**stats, 'size': stat.st_size, 'sha256': file_hash}
             return True
         except Exception as e:
+            # The .part file and its state are kept so the next call can resume.
             print(f"[Updater] Download failed: {e}")
             return False
 
+    def _download_stream(self, download_url, part_path, progress_callback=None):
+        # Single connection for servers without range support; hashed while streaming.
+        sha256 = hashlib.sha256()
+        done = 0
+        with self.session.get(download_url, stream=True, timeout=30) as r:
+            r.raise_for_status()
+            total = int(r.headers.get('Content-Length', 0))
+            with open(part_path, 'wb') as f:
+                for chunk in r.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    done += len(chunk)
+                    if progress_callback:
+                        progress_callback(done, total)
+        return sha256.hexdigest()
+
+    def _download_ranges(self, download_url, part_path, state_path, size, validator, manifest, base_path,
+                         progress_callback=None):
+        chunk_size = manifest['chunk_size'] if manifest else self.chunk_size
+        if manifest and manifest['size'] != size:
+            raise ValueError(f"Manifest is for {manifest['size']} bytes, server has {size}")
+        count = -(-size // chunk_size)
+        done = set()
+        if os.path.exists(state_path) and os.path.exists(part_path):
+            with open(state_path, 'r') as f:
+                state = json.load(f)
+            if state.get('url') == download_url and state.get('validator') == validator and state.get('size') == size \
+                    and state.get('chunk_size') == chunk_size and validator:
+                done = set(state['done'])
+        if not done:
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+        stats = {'mode': 'ranges', 'chunks': count, 'resumed_chunks': len(done), 'reused_chunks': 0,
+                 'downloaded_bytes': 0}
+        base = None
+        base_lock = threading.Lock()
+        if manifest and os.path.exists(base_path) and os.path.abspath(base_path) != os.path.abspath(part_path):
+            base = open(base_path, 'rb')
+
+        def save_state():
+            tmp_path = state_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'url': download_url, 'validator': validator, 'size': size, 'chunk_size': chunk_size,
+                           'done': sorted(done)}, f)
+            os.replace(tmp_path, state_path)
+
+        def fetch(index):
+            start = index * chunk_size
+            end = min(start + chunk_size, size)
+            if index in done:
+                with open(part_path, 'rb') as f:
+                    f.seek(start)
+                    return index, f.read(end - start), 'resumed'
+            expected = manifest['chunks'][index] if manifest else None
+            if base is not None:
+                with base_lock:
+                    base.seek(start)
+                    data = base.read(end - start)
+                if hashlib.sha256(data).hexdigest() == expected:
+                    self._write_chunk(part_path, start, data)
+                    return index, data, 'reused'
+            for attempt in range(3):
+                headers = {'Range': f'bytes={start}-{end - 1}'}
+                if validator:
+                    headers['If-Range'] = validator
+                try:
+                    response = self.session.get(download_url, headers=headers, timeout=30)
+                    if response.status_code != 206:
+                        raise IOError(f"expected 206 Partial Content, got {response.status_code}")
+                    data = response.content
+                    if len(data) != end - start:
+                        raise IOError(f"short read for bytes {start}-{end - 1}")
+                    if expected and hashlib.sha256(data).hexdigest() != expected:
+                        raise IOError(f"chunk {index} does not match the manifest")
+                    break
+                except (IOError, requests.RequestException):
+                    if attempt == 2:
+                        raise
+            self._write_chunk(part_path, start, data)
+            return index, data, 'downloaded'
+
+        # Chunks are fetched out of order but hashed in order; the window bounds how many
+        # finished-but-unhashed chunks are held in memory.
+        sha256 = hashlib.sha256()
+        window = 2 * self.max_workers
+        completed = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(fetch, i) for i in range(min(window, count))]
+                for index in range(count):
+                    _, data, how = futures[index].result()
+                    if index + window < count:
+                        futures.append(pool.submit(fetch, index + window))
+                    sha256.update(data)
+                    futures[index] = None
+                    completed += len(data)
+                    if how != 'resumed':
+                        done.add(index)
+                        save_state()
+                    if how == 'reused':
+                        stats['reused_chunks'] += 1
+                    elif how == 'downloaded':
+                        stats['downloaded_bytes'] += len(data)
+                    if progress_callback:
+                        progress_callback(completed, size)
+        finally:
+            if base is not None:
+                base.close()
+        return sha256.hexdigest(), stats
+
+    @staticmethod
+    def _write_chunk(part_path, offset, data):
+        with open(part_path, 'r+b') as f:
+            f.seek(offset)
+            f.write(data)
+
     def get_current_version(self):
         """Return the current version of the application."""
         return self.version
@@ -38,7 +228,7 @@ class Updater:
     def get_latest_version_info(self):
         """Fetch and return the latest version info from the update server."""
         try:
-            response = requests.get(self.update_url, timeout=5)
+            response = self.session.get(self.update_url, timeout=5)
             if response.status_code == 200:
                 return response.json()
             return None
@@ -47,12 +237,19 @@ class Updater:
             return None
 
     def verify_update_integrity(self, file_path, expected_hash):
-        """Verify the integrity of the downloaded update file using SHA256."""
-        import hashlib
+        """Verify the integrity of the downloaded update file using SHA256.
+
+        Files fetched by download_update were hashed as they arrived; that hash
+        is reused as long as the file's size and mtime are unchanged.
+        """
         sha256 = hashlib.sha256()
         try:
+            stat = os.stat(file_path)
+            known = self._hashes.get(os.path.abspath(file_path))
+            if known and known[:2] == (stat.st_size, stat.st_mtime_ns):
+                return known[2] == expected_hash, known[2]
             with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b''):
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
                     sha256.update(chunk)
             file_hash = sha256.hexdigest()
             return file_hash == expected_hash, file_hash
@@ -72,6 +269,60 @@ class Updater:
         print(f"[Updater] Rolling back using backup at {backup_path} (stub)")
         return True
 
+def serve_updates(directory, port=0):
+    """Serve directory over HTTP with Range/ETag support on a background thread.
+
+    A local stand-in for the update server when testing downloads; returns the
+    server (server.server_address[1] is the port, server.shutdown() stops it).
+    """
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    class RangeRequestHandler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def send_head(self):
+            path = self.translate_path(self.path)
+            if not os.path.isfile(path):
+                return super().send_head()
+            stat = os.stat(path)
+            size = stat.st_size
+            etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+            start, end = 0, size - 1
+            ranged = False
+            spec = self.headers.get('Range', '')
+            if spec.startswith('bytes=') and self.headers.get('If-Range', etag) == etag:
+                first, _, last = spec[6:].partition('-')
+                start = int(first) if first else max(0, size - int(last))
+                end = min(int(last), size - 1) if first and last else size - 1
+                ranged = True
+            f = open(path, 'rb')
+            f.seek(start)
+            self.send_response(206 if ranged else 200)
+            self.send_header('Content-Type', self.guess_type(path))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(end - start + 1))
+            if ranged:
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.end_headers()
+            self.remaining = end - start + 1
+            return f
+
+        def copyfile(self, source, outputfile):
+            while self.remaining > 0:
+                data = source.read(min(64 * 1024, self.remaining))
+                if not data:
+                    break
+                outputfile.write(data)
+                self.remaining -= len(data)
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), partial(RangeRequestHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
 if __name__ == "__main__":
     updater = Updater(version="1.0.0", update_url="https://example.com/sackbot_update.json")
     has_update, latest, changelog = updater.check_for_update()
@@ -82,6 +333,10 @@ if __name__ == "__main__":
     # Example: verify integrity (stub hash)
     # ok, file_hash = updater.verify_update_integrity('sackbot-latest.zip', 'expectedsha256hash')
     # print('Integrity OK:', ok, 'Hash:', file_hash)
+    # Example: parallel, resumable download verified while it streams; with a chunk manifest
+    # (build_chunk_manifest on the release side) only chunks that changed since base_path are fetched
+    # updater.download_update('https://example.com/sackbot-latest.zip', 'sackbot-latest.zip',
+    #                         manifest='https://example.com/sackbot-latest.zip.manifest.json')
     # Example: apply and rollback update (stubs)
     # updater.apply_update('sackbot-latest.zip')
     # updater.rollback_update('backup.zip')
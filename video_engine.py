@@ -1,89 +1,1059 @@
 import cv2
+import inspect
 import numpy as np
 import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from effects import compile_effects, parse_effects
+from frame_plan import StaticFrameDetector, plan_frame_ops
+from export_cache import ExportCache, fingerprint_input
+from encoders import ENCODERS, LOSSLESS_EXT, LOSSLESS_OPTIONS, open_encoder, resolve_encoder
+from buffer_pool import FrameBufferPool, PeakMemoryTracker
+from profiler import StageProfiler, merge_traces
+from preview import PreviewSlot, PreviewTap
+from progress import ProgressReporter, TerminalSink, CallbackSink, JsonLinesSink, QueueSink, ExportCancelled
+
+
+RES_MAP = {'4k': (3840, 2160), '2160p': (3840, 2160), '1440p': (2560, 1440), '1080p': (1920, 1080), '720p': (1280, 720), '480p': (854, 480)}
+
+
+def resolve_resolution(resolution):
+    return RES_MAP.get(str(resolution).lower(), (1920, 1080))
+
+
+def _output_path_for(output_path, fmt):
+    ext = fmt.lower()
+    if not output_path.lower().endswith(f'.{ext}'):
+        output_path += f'.{ext}'
+    return output_path, ext
+
+
+def _encoder_opts(encoder, codec, encoder_preset, crf, bitrate, encoder_threads, **_):
+    return {'encoder': resolve_encoder(encoder), 'codec': codec, 'encoder_preset': encoder_preset,
+            'crf': crf, 'bitrate': bitrate, 'encoder_threads': encoder_threads}
+
+
+def _resolve_range(cap, start_time=None, end_time=None, start_frame=None, end_frame=None, frame_stride=1, output_fps=None):
+    """Turn time/frame range and stride options into (start, end, stride, fps_out, frame_count).
+
+    end is None when the export runs to EOF of a source with an unknown
+    frame count; frame_count is the number of frames the export will write.
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS) or 24
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    start = start_frame if start_frame is not None else round(start_time * fps) if start_time is not None else 0
+    end = end_frame if end_frame is not None else round(end_time * fps) if end_time is not None else None
+    if total > 0:
+        end = total if end is None else min(end, total)
+    start = max(0, int(start))
+    if end is not None and end <= start:
+        raise ValueError(f"Empty export range: frames {start}-{end}")
+    stride = max(1, round(fps / output_fps)) if output_fps else max(1, int(frame_stride))
+    count = -(-(end - start) // stride) if end is not None else 0
+    return start, end, stride, fps / stride, count
+
+
+def _iter_frames(cap, start=0, end=None, stride=1, acquire=None):
+    """Yield every stride-th frame of [start, end), seeking to start instead of decoding up to it.
+
+    acquire, if given, returns the buffer each frame is decoded into.
+    """
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    pos = start
+    while end is None or pos < end:
+        if (pos - start) % stride == 0:
+            ret, frame = cap.read(acquire()) if acquire else cap.read()
+            if not ret:
+                return
+            yield frame
+        elif not cap.grab():
+            # Skipped frames are only grabbed, never converted to BGR.
+            return
+        pos += 1
+
+
+def _frame_buffer(size):
+    w, h = size
+    return np.empty((h, w, 3), dtype=np.uint8) if w and h else None
+
+
+def _reader(buffer):
+    # acquire() for _iter_frames that decodes every frame into the same buffer.
+    return (lambda: buffer) if buffer is not None else None
+
+
+def _run_in_pool(worker, task_args, workers, progress_callback=None, on_result=None, task_totals=None):
+    """Run worker(*args, task_index, progress_queue) for each task in a process pool.
+
+    Returns a list of (result, error) tuples in task order. Progress reported by
+    the workers is merged and forwarded to progress_callback as (done, total),
+    where total is sum(task_totals) from the start (one unit per task if not
+    given) and each task counts for its total times the fraction it reported,
+    so the merged figure never goes backwards when another task starts.
+    on_result(task_index, result, error) is called as each task finishes.
+    """
+    import multiprocessing
+    outcomes = [(None, None)] * len(task_args)
+    task_totals = list(task_totals) if task_totals else [1] * len(task_args)
+    fractions = [0.0] * len(task_args)
+    with multiprocessing.Manager() as manager:
+        queue = manager.Queue() if progress_callback else None
+
+        def drain(finished=()):
+            updated = bool(finished)
+            for idx in finished:
+                fractions[idx] = 1.0
+            while queue is not None and not queue.empty():
+                idx, current, total = queue.get()
+                fractions[idx] = max(fractions[idx], min(1.0, current / total) if total else 0.0)
+                updated = True
+            if updated and progress_callback:
+                progress_callback(round(sum(f * t for f, t in zip(fractions, task_totals))), sum(task_totals))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(worker, *args, idx, queue) for idx, args in enumerate(task_args)]
+            index_of = {future: idx for idx, future in enumerate(futures)}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                drain([index_of[future] for future in done])
+                for future in done:
+                    idx = index_of[future]
+                    try:
+                        outcomes[idx] = (future.result(), None)
+                    except Exception as e:
+                        outcomes[idx] = (None, e)
+                    if on_result:
+                        on_result(idx, *outcomes[idx])
+            drain()
+    return outcomes
+
+
+def _estimate_frames(job):
+    # Frames a job will write, for sizing its share of batch progress before it starts.
+    cap = cv2.VideoCapture(job.get('input_path', ''))
+    try:
+        range_opts = {k: job.get(k) for k in ('start_time', 'end_time', 'start_frame', 'end_frame', 'output_fps')}
+        return max(1, _resolve_range(cap, frame_stride=job.get('frame_stride', 1), **range_opts)[4])
+    except Exception:
+        return 1
+    finally:
+        cap.release()
+
+
+def run_export_group(jobs, task_index, progress_queue=None):
+    """Worker-process entry for parallel batches and job_queue.py; returns ([ok per job], seconds).
+
+    One engine per task so failures stay isolated. A task is one job, or several
+    jobs sharing an input that are decoded once.
+    """
+    engine = VideoEngine()
+    sinks = []
+    if progress_queue is not None:
+        # Jobs in a group advance in lockstep, so the first one speaks for all of them.
+        scale = len(jobs)
+        sinks = [lambda event: progress_queue.put((task_index, event['frames_done'] * scale,
+                                                   event['total_frames'] * scale))]
+    start = time.perf_counter()
+    try:
+        # Interleaved terminal bars from several workers are unreadable; the parent reports instead.
+        if len(jobs) == 1:
+            oks = [engine.export_video(**{'quiet': True, **jobs[0], 'progress_sinks': sinks})]
+        else:
+            oks = engine._export_fanout([{'quiet': True, **job} for job in jobs], progress_sinks=sinks)
+    except Exception as e:
+        print(f"[VideoEngine] Task {task_index} failed: {e}")
+        oks = [False] * len(jobs)
+    return oks, time.perf_counter() - start
+
+
+def _export_segment(input_path, segment_path, ext, fps, size, start, end, stride, render_opts, segment_index, progress_queue=None):
+    # Renders every stride-th frame of [start, end) into its own file; end=None reads to EOF.
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        raise IOError(f"Failed to open input video: {input_path}")
+    plan = plan_frame_ops(cap, size, compile_effects(render_opts['effect'], render_opts['brightness']),
+                          render_opts['fit'], render_opts['pad_color'])
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    sinks = [QueueSink(progress_queue, segment_index)] if progress_queue is not None else []
+    reporter = ProgressReporter(-(-((end if end is not None else total) - start) // stride), sinks, percent_step=1)
+    try:
+        out = open_encoder(segment_path, fps, size, ext, **render_opts['encoder_opts'])
+    except Exception:
+        cap.release()
+        raise
+    written = 0
+    read_buffer, out_buffer = _frame_buffer(plan.src_size), _frame_buffer(size)
+    try:
+        for frame in _iter_frames(cap, start, end, stride, _reader(read_buffer)):
+            out.write(plan.apply(frame, out=out_buffer))
+            written += 1
+            reporter.update(written)
+        reporter.finish()
+    finally:
+        cap.release()
+        out.release()
+    return written
+
+
+def _join_segments(segment_paths, output_path, ext, fps, size, encoder_opts=None, lossless=False):
+    """Concatenate segment files into output_path.
+
+    Segments in the final codec are joined by ffmpeg stream copy, without
+    touching the frames; this raises if ffmpeg is missing or fails. lossless=True
+    means the segments are LOSSLESS_OPTIONS intermediates: they are decoded and
+    encoded once with encoder_opts, the same single lossy pass a serial export makes.
+    """
+    import subprocess
+    import tempfile
+    if lossless:
+        out = open_encoder(output_path, fps, size, ext, **(encoder_opts or {}))
+        try:
+            for path in segment_paths:
+                cap = cv2.VideoCapture(path)
+                try:
+                    while True:
+                        ret, frame = cap.read()
+                        if not ret:
+                            break
+                        out.write(frame)
+                finally:
+                    cap.release()
+        finally:
+            out.release()
+        return True
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg is required to join segments without re-encoding them")
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        for path in segment_paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+        list_path = f.name
+    try:
+        result = subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                                 '-i', list_path, '-c', 'copy', output_path])
+    finally:
+        os.remove(list_path)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not join segments into {output_path} (exit code {result.returncode})")
+    return True
+
 
 class VideoEngine:
     def __init__(self):
-        pass
+        self.last_batch_report = None
+        self.last_pipeline_stats = None
+        self.last_export_stats = None
+        self.preview_slot = None
+
+    def export_video(self, input_path, output_path, resolution='1080p', fmt='mp4', bitrate='auto', progress_callback=None, live_preview=False, effect=None, brightness=1.0,
+                     segments=1, workers=None, pipeline=False, transform_workers=1, queue_size=8, fit='stretch', pad_color=(0, 0, 0),
+                     quiet=False, progress_sinks=None, progress_log=None, progress_interval=0.1,
+                     encoder='auto', codec='libx264', encoder_preset='medium', crf=None, encoder_threads=0,
+                     start_time=None, end_time=None, start_frame=None, end_frame=None, frame_stride=1, output_fps=None,
+                     batch_size=1, max_batch_bytes=256 * 2**20, reuse_static=False, static_tolerance=0.0,
+                     resumable=False, checkpoint_frames=1000, profile=None, control=None, preview_fps=15, preview_width=480):
+        """Export one video; returns True on success.
 
-    def export_video(self, input_path, output_path, resolution='1080p', fmt='mp4', bitrate='auto', progress_callback=None, live_preview=False, effect=None, brightness=1.0):
+        live_preview posts a downscaled copy of the output frames, at most
+        preview_fps a second, to a preview.PreviewSlot: the one passed in, or
+        with live_preview=True a new one in self.preview_slot. The slot keeps
+        only the latest frame, so a slow reader never slows the export down.
+
+        control (a progress.ExportControl) is checked once per frame: pausing it
+        holds the export in place, cancelling it stops the export, releases the
+        capture and encoder and deletes the partial output.
+        """
+        log = (lambda *args, **kwargs: None) if quiet else print
         try:
             # Resolution handling
-            res_map = {'4k': (3840, 2160), '2160p': (3840, 2160), '1440p': (2560, 1440), '1080p': (1920, 1080), '720p': (1280, 720), '480p': (854, 480)}
-            if resolution.lower() in res_map:
-                w, h = res_map[resolution.lower()]
-            else:
-                w, h = (1920, 1080)
+            w, h = resolve_resolution(resolution)
             # Format handling
-            ext = fmt.lower()
-            if not output_path.lower().endswith(f'.{ext}'):
-                output_path += f'.{ext}'
+            output_path, ext = _output_path_for(output_path, fmt)
+            encoder_opts = _encoder_opts(encoder, codec, encoder_preset, crf, bitrate, encoder_threads)
+            range_opts = {'start_time': start_time, 'end_time': end_time, 'start_frame': start_frame,
+                          'end_frame': end_frame, 'frame_stride': frame_stride, 'output_fps': output_fps}
+            if resumable:
+                cap = cv2.VideoCapture(input_path)
+                try:
+                    unknown = cap.isOpened() and _resolve_range(cap, **range_opts)[4] <= 0
+                finally:
+                    cap.release()
+                if unknown:
+                    # Parts need a frame count to be planned; the source still exports fine in one pass.
+                    log(f"[VideoEngine] Unknown frame count, cannot checkpoint; exporting in one pass: {input_path}")
+                    resumable, segments = False, 1
+            if segments == 'auto':
+                segments = workers or os.cpu_count() or 1
+            if not resumable and segments and segments > 1 and not shutil.which('ffmpeg'):
+                # Joining without ffmpeg would mean decoding and re-encoding every segment, serially.
+                log("[VideoEngine] Segmented export needs ffmpeg to join segments; exporting serially")
+                segments = 1
+            render_opts = {'effect': effect, 'brightness': brightness, 'fit': fit, 'pad_color': pad_color,
+                           'encoder_opts': encoder_opts, 'range_opts': range_opts}
+            if profile and (resumable or (segments and segments != 1)):
+                log("[VideoEngine] Profiling covers single-process exports only; ignoring profile")
+            if live_preview and (resumable or (segments and segments != 1)):
+                log("[VideoEngine] Live preview covers single-process exports only; ignoring live_preview")
+            if reuse_static and (resumable or (segments and segments != 1) or pipeline or (batch_size or 1) > 1):
+                log("[VideoEngine] Static frame reuse covers the plain frame loop only; ignoring reuse_static")
+            if resumable:
+                return self._export_resumable(input_path, output_path, ext, (w, h), render_opts, checkpoint_frames,
+                                              lambda total: self._make_reporter(total, output_path, progress_callback, quiet,
+                                                                                progress_sinks, progress_log, progress_interval),
+                                              log, control)
+            if control and segments and segments != 1:
+                log("[VideoEngine] Segmented exports cannot be paused or cancelled once started")
+            if segments and segments > 1:
+                return self._export_segmented(input_path, output_path, ext, (w, h), render_opts, segments, workers,
+                                              lambda total: self._make_reporter(total, output_path, progress_callback, quiet,
+                                                                                progress_sinks, progress_log, progress_interval),
+                                              log)
             # Open input video
             cap = cv2.VideoCapture(input_path)
             if not cap.isOpened():
                 print(f"[VideoEngine] Failed to open input video: {input_path}")
                 return False
-            fourcc = cv2.VideoWriter_fourcc(*('XVID' if ext == 'avi' else 'mp4v'))
-            fps = cap.get(cv2.CAP_PROP_FPS) or 24
-            out = cv2.VideoWriter(output_path, fourcc, fps, (w, h))
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            frame_idx = 0
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                frame_resized = cv2.resize(frame, (w, h))
-                # --- Video Effects ---
-                if effect == 'grayscale':
-                    frame_resized = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2GRAY)
-                    frame_resized = cv2.cvtColor(frame_resized, cv2.COLOR_GRAY2BGR)
-                elif effect == 'invert':
-                    frame_resized = cv2.bitwise_not(frame_resized)
-                if brightness != 1.0:
-                    frame_resized = cv2.convertScaleAbs(frame_resized, alpha=brightness, beta=0)
-                # --- End Effects ---
-                out.write(frame_resized)
-                frame_idx += 1
-                # Terminal progress bar for user POV
-                percent = (frame_idx / total_frames) * 100 if total_frames else 0
-                bar = ('#' * int(percent // 2)).ljust(50)
-                print(f"\rExporting: [{bar}] {percent:.1f}% ({frame_idx}/{total_frames})", end='')
-                if percent == 100 or frame_idx == total_frames:
-                    print("\nExport complete! Output saved to:", output_path)
-                if progress_callback:
-                    progress_callback(frame_idx, total_frames)
-            print()  # Newline after progress bar
-            cap.release()
-            out.release()
+            try:
+                start, end, stride, fps, total_frames = _resolve_range(cap, **range_opts)
+                out = open_encoder(output_path, fps, (w, h), ext, **encoder_opts)
+            except Exception:
+                cap.release()
+                raise
+            plan = plan_frame_ops(cap, (w, h), compile_effects(effect, brightness), fit, pad_color)
+            log(f"[VideoEngine] Frame plan: {plan.describe()}; encoder: {out.name}")
+            if stride > 1 or any(v is not None for v in (start_time, end_time, start_frame, end_frame)):
+                log(f"[VideoEngine] Range: frames {start}-{end if end is not None else 'EOF'} every {stride} -> {total_frames} frames")
+            reporter = self._make_reporter(total_frames, output_path, progress_callback, quiet,
+                                           progress_sinks, progress_log, progress_interval)
+            memory = PeakMemoryTracker()
+            on_frame = reporter.update
+            if control:
+                def on_frame(frames_done):
+                    control.checkpoint()
+                    reporter.update(frames_done)
+            make_frames = lambda acquire: _iter_frames(cap, start, end, stride, acquire)
+            profiler = StageProfiler(output_path) if profile else None
+            if profiler:
+                plan.profiler = profiler
+                out = profiler.wrap_encoder(out)
+                make_frames = lambda acquire: profiler.frames(_iter_frames(cap, start, end, stride, acquire))
             if live_preview:
-                cv2.destroyAllWindows()
+                self.preview_slot = live_preview if isinstance(live_preview, PreviewSlot) else PreviewSlot()
+                out = PreviewTap(out, self.preview_slot, preview_fps, preview_width)
+            try:
+                if pipeline:
+                    buffer_bytes = self._export_pipelined(make_frames, out, plan, on_frame, transform_workers, queue_size,
+                                                          log, memory)
+                elif (batch_size or 1) > 1:
+                    buffer_bytes = self._export_batched(make_frames, out, plan, on_frame, batch_size, max_batch_bytes,
+                                                        log, memory)
+                else:
+                    # Decode into and render into the same buffers for every frame. With
+                    # reuse_static a second read buffer keeps the last rendered source frame
+                    # intact, and the output buffer still holds its rendering.
+                    read_buffers = [_frame_buffer(plan.src_size) for _ in range(2 if reuse_static else 1)]
+                    out_buffer = _frame_buffer((w, h))
+                    buffer_bytes = sum(b.nbytes for b in read_buffers + [out_buffer] if b is not None)
+                    detector = StaticFrameDetector(static_tolerance) if reuse_static else None
+                    reference = None
+                    acquire = _reader(read_buffers[0])
+                    if detector and read_buffers[0] is not None:
+                        acquire = lambda: read_buffers[1] if reference is read_buffers[0] else read_buffers[0]
+                    frame_idx = 0
+                    frame_resized = None
+                    for frame in make_frames(acquire):
+                        if not (detector and detector.is_duplicate(frame, reference)):
+                            frame_resized = plan.apply(frame, out=out_buffer)
+                            reference = frame
+                        out.write(frame_resized)
+                        frame_idx += 1
+                        on_frame(frame_idx)
+                        memory.sample()
+                    if detector:
+                        log(f"[VideoEngine] Static frames reused: {detector.reused}/{detector.checked} "
+                            f"({detector.reuse_ratio:.1%}, tolerance {static_tolerance})")
+            finally:
+                cap.release()
+                out.release()
+            reporter.finish()
+            self.last_export_stats = {'output_path': output_path, 'frames': reporter.frames_done,
+                                      'buffer_bytes': buffer_bytes, **memory.report()}
+            if reuse_static and not pipeline and not (batch_size or 1) > 1:
+                self.last_export_stats['static_reuse_ratio'] = detector.reuse_ratio
+            if live_preview:
+                self.last_export_stats.update(preview_frames=self.preview_slot.offered,
+                                              preview_dropped=self.preview_slot.dropped)
+            log(f"[VideoEngine] Peak RSS {self.last_export_stats['peak_rss'] / 2**20:.1f} MiB "
+                f"(+{self.last_export_stats['peak_growth'] / 2**20:.1f} MiB during export, "
+                f"{buffer_bytes / 2**20:.1f} MiB frame buffers)")
+            if profiler:
+                self.last_export_stats['profile'] = profiler.summary()
+                log(f"[VideoEngine] Stage timings:\n{profiler.format_summary()}")
+                if isinstance(profile, str):
+                    log(f"[VideoEngine] Trace written to {profiler.write_trace(profile)}")
             return True
+        except ExportCancelled:
+            # The capture and encoder were released on the way out; drop the partial file.
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            print(f"[VideoEngine] Export cancelled: {output_path}")
+            return False
         except Exception as e:
             print(f"[VideoEngine] Export failed: {e}")
-            if live_preview:
-                cv2.destroyAllWindows()
             return False
 
-    def batch_export(self, jobs, progress_callback=None):
-        results = []
+    def _make_reporter(self, total_frames, output_path, progress_callback=None, quiet=False,
+                       progress_sinks=None, progress_log=None, progress_interval=0.1):
+        sinks = [] if quiet else [TerminalSink()]
+        if progress_callback:
+            sinks.append(CallbackSink(progress_callback))
+        if progress_log:
+            sinks.append(JsonLinesSink(progress_log))
+        sinks.extend(progress_sinks or [])
+        return ProgressReporter(total_frames, sinks, output_path, interval=progress_interval)
+
+    def _export_pipelined(self, make_frames, out, plan, on_frame, transform_workers=1, queue_size=8, log=print, memory=None):
+        """Decode, transform and encode on separate threads joined by bounded queues.
+
+        OpenCV releases the GIL inside read/resize/write, so the stages overlap.
+        Frames carry their index and the encoder reorders them, so any number of
+        transform workers still produces frames in source order. Time each stage
+        spends blocked on a queue is stored in self.last_pipeline_stats.
+
+        make_frames(acquire) must return the decoded frame iterator. Frames are
+        decoded into and rendered into two fixed buffer pools; the output buffer
+        is taken at decode time, in frame order, so the encoder's reorder buffer
+        can never starve the frame it is waiting for. Returns the pools' size in bytes.
+        """
+        import queue
+        import threading
+        transform_workers = max(1, transform_workers)
+        decoded = queue.Queue(maxsize=queue_size)
+        transformed = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        errors = []
+        waits = {'decode_buffers': 0.0, 'decode_put': 0.0, 'transform_get': 0.0, 'transform_put': 0.0, 'encode_get': 0.0}
+        waits_lock = threading.Lock()
+        in_flight = 2 * queue_size + transform_workers + 2
+        sw, sh = plan.src_size
+        tw, th = plan.target_size
+        read_pool = FrameBufferPool((sh, sw, 3), queue_size + transform_workers + 2) if sw and sh else None
+        out_pool = FrameBufferPool((th, tw, 3), in_flight)
+
+        def put(q, item, stage):
+            start = time.perf_counter()
+            try:
+                while not stop.is_set():
+                    try:
+                        q.put(item, timeout=0.1)
+                        return True
+                    except queue.Full:
+                        pass
+                return False
+            finally:
+                with waits_lock:
+                    waits[stage] += time.perf_counter() - start
+
+        def get(q, stage):
+            start = time.perf_counter()
+            try:
+                while not stop.is_set():
+                    try:
+                        return q.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                return None
+            finally:
+                with waits_lock:
+                    waits[stage] += time.perf_counter() - start
+
+        def acquire(pool):
+            start = time.perf_counter()
+            try:
+                while not stop.is_set():
+                    try:
+                        return pool.acquire(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                return None
+            finally:
+                with waits_lock:
+                    waits['decode_buffers'] += time.perf_counter() - start
+
+        def decoder():
+            idx = 0
+            try:
+                for frame in make_frames((lambda: acquire(read_pool)) if read_pool else None):
+                    out_buffer = acquire(out_pool)
+                    if out_buffer is None or not put(decoded, (idx, frame, out_buffer), 'decode_put'):
+                        break
+                    idx += 1
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                for _ in range(transform_workers):
+                    put(decoded, None, 'decode_put')
+
+        def transformer():
+            try:
+                while True:
+                    item = get(decoded, 'transform_get')
+                    if item is None:
+                        break
+                    idx, frame, out_buffer = item
+                    result = plan.apply(frame, out=out_buffer)
+                    if read_pool:
+                        read_pool.release(frame)
+                    if not put(transformed, (idx, result), 'transform_put'):
+                        break
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(transformed, None, 'transform_put')
+
+        threads = [threading.Thread(target=decoder, daemon=True)]
+        threads += [threading.Thread(target=transformer, daemon=True) for _ in range(transform_workers)]
+        for t in threads:
+            t.start()
+        start = time.perf_counter()
+        pending = {}
+        next_idx = 0
+        finished_workers = 0
+        try:
+            while finished_workers < transform_workers:
+                item = get(transformed, 'encode_get')
+                if item is None:
+                    if stop.is_set():
+                        break
+                    finished_workers += 1
+                    continue
+                pending[item[0]] = item[1]
+                while next_idx in pending:
+                    frame = pending.pop(next_idx)
+                    out.write(frame)
+                    out_pool.release(frame)
+                    next_idx += 1
+                    on_frame(next_idx)
+                    if memory:
+                        memory.sample()
+        except Exception:
+            stop.set()
+            raise
+        finally:
+            for t in threads:
+                t.join()
+        if errors:
+            raise errors[0]
+        elapsed = time.perf_counter() - start
+        self.last_pipeline_stats = {'frames': next_idx, 'elapsed': elapsed,
+                                    'fps': next_idx / elapsed if elapsed else 0,
+                                    'transform_workers': transform_workers, 'queue_waits': waits}
+        log(f"[VideoEngine] Pipeline: {next_idx} frames at {self.last_pipeline_stats['fps']:.1f} fps; queue waits "
+              + ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in waits.items()))
+        return out_pool.nbytes + (read_pool.nbytes if read_pool else 0)
+
+    def _export_batched(self, make_frames, out, plan, on_frame, batch_size, max_batch_bytes=256 * 2**20, log=print, memory=None):
+        """Decode K frames into one contiguous (K, H, W, 3) block, transform the block, then write in order.
+
+        K is batch_size, lowered so the source and output blocks fit in
+        max_batch_bytes. Returns the blocks' size in bytes.
+        """
+        sw, sh = plan.src_size
+        tw, th = plan.target_size
+        per_frame = 3 * (sw * sh + 2 * tw * th)
+        k = max(1, min(batch_size, max_batch_bytes // per_frame if per_frame else batch_size))
+        if k < batch_size:
+            log(f"[VideoEngine] Batch size capped at {k} frames by max_batch_bytes")
+        src_block = np.empty((k, sh, sw, 3), dtype=np.uint8)
+        out_block = np.empty((k, th, tw, 3), dtype=np.uint8)
+        count = 0
+        written = 0
+
+        def flush():
+            nonlocal written
+            plan.apply_block(src_block, count, out_block)
+            for i in range(count):
+                out.write(out_block[i])
+                written += 1
+                on_frame(written)
+                if memory:
+                    memory.sample()
+
+        for frame in make_frames(lambda: src_block[count]):
+            if not np.shares_memory(frame, src_block):
+                # The decoder could not reuse the slot (size mismatch); copy the frame in.
+                np.copyto(src_block[count], frame)
+            count += 1
+            if count == k:
+                flush()
+                count = 0
+        if count:
+            flush()
+        return src_block.nbytes + out_block.nbytes
+
+    def _export_segmented(self, input_path, output_path, ext, size, render_opts, segments, workers, make_reporter, log=print):
+        import tempfile
+        cap = cv2.VideoCapture(input_path)
+        if not cap.isOpened():
+            print(f"[VideoEngine] Failed to open input video: {input_path}")
+            return False
+        try:
+            start, end, stride, fps, total_frames = _resolve_range(cap, **render_opts['range_opts'])
+            plan = plan_frame_ops(cap, size, compile_effects(render_opts['effect'], render_opts['brightness']),
+                                  render_opts['fit'], render_opts['pad_color'])
+        finally:
+            cap.release()
+        log(f"[VideoEngine] Frame plan: {plan.describe()}")
+        if total_frames <= 0:
+            print(f"[VideoEngine] Unknown frame count, cannot segment: {input_path}")
+            return False
+        segments = min(segments, total_frames)
+        bounds = [total_frames * i // segments for i in range(segments + 1)]
+        workers = max(1, min(workers or os.cpu_count() or 1, segments))
+        segment_dir = tempfile.mkdtemp(prefix='sackbot_segments_', dir=os.path.dirname(os.path.abspath(output_path)))
+        segment_paths = [os.path.join(segment_dir, f'segment_{i:04d}.{ext}') for i in range(segments)]
+        # Bounds count output frames; the last segment runs to the range end (or EOF when no
+        # explicit end was given) in case CAP_PROP_FRAME_COUNT is only an estimate.
+        explicit_end = any(render_opts['range_opts'][k] is not None for k in ('end_time', 'end_frame'))
+        last_end = end if explicit_end else None
+        task_args = [(input_path, segment_paths[i], ext, fps, size, start + bounds[i] * stride,
+                      start + bounds[i + 1] * stride if i < segments - 1 else last_end, stride, render_opts)
+                     for i in range(segments)]
+        log(f"[VideoEngine] Exporting {total_frames} frames in {segments} segments on {workers} workers")
+        reporter = make_reporter(total_frames)
+        try:
+            outcomes = _run_in_pool(_export_segment, task_args, workers,
+                                    lambda current, total: reporter.update(current),
+                                    task_totals=[bounds[i + 1] - bounds[i] for i in range(segments)])
+            for idx, (written, error) in enumerate(outcomes):
+                expected = bounds[idx + 1] - bounds[idx]
+                if error is not None or (idx < segments - 1 and written != expected):
+                    print(f"[VideoEngine] Segment {idx} failed: {error or f'wrote {written}/{expected} frames'}")
+                    return False
+            _join_segments(segment_paths, output_path, ext, fps, size, render_opts['encoder_opts'])
+            reporter.finish()
+            return True
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
+    def _export_resumable(self, input_path, output_path, ext, size, render_opts, checkpoint_frames, make_reporter, log=print,
+                          control=None):
+        """Render in checkpoint_frames-sized parts under <output>.parts, then join them.
+
+        manifest.json records each finished part. If the export is interrupted,
+        rerunning the same export skips those parts and continues with the first
+        unfinished one; a manifest written for a different input or different
+        settings is discarded. Cancelling through control deletes only the part
+        in progress, so the export can still be resumed later.
+
+        With ffmpeg the parts are encoded in the final codec and joined by stream
+        copy. Without it they are lossless FFV1 files that are encoded once when
+        joined, so the frames still go through only one lossy encode.
+        """
+        import hashlib
+        import json
+        cap = cv2.VideoCapture(input_path)
+        if not cap.isOpened():
+            print(f"[VideoEngine] Failed to open input video: {input_path}")
+            return False
+        try:
+            start, end, stride, fps, total_frames = _resolve_range(cap, **render_opts['range_opts'])
+        finally:
+            cap.release()
+        if total_frames <= 0:
+            print(f"[VideoEngine] Unknown frame count, cannot checkpoint: {input_path}")
+            return False
+        checkpoint_frames = max(1, int(checkpoint_frames))
+        parts = -(-total_frames // checkpoint_frames)
+        lossless = not shutil.which('ffmpeg')
+        part_ext = LOSSLESS_EXT if lossless else ext
+        part_opts = {**render_opts, 'encoder_opts': LOSSLESS_OPTIONS} if lossless else render_opts
+        parts_dir = output_path + '.parts'
+        manifest_path = os.path.join(parts_dir, 'manifest.json')
+        signature = hashlib.sha256(json.dumps([fingerprint_input(input_path), size, render_opts, checkpoint_frames,
+                                               total_frames, lossless], sort_keys=True, default=str).encode()).hexdigest()
+        manifest = None
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                manifest = None
+            if not manifest or manifest.get('signature') != signature:
+                log(f"[VideoEngine] Discarding stale checkpoints: {parts_dir}")
+                shutil.rmtree(parts_dir, ignore_errors=True)
+                manifest = None
+        if manifest is None:
+            manifest = {'signature': signature, 'parts': parts, 'done': {}}
+        os.makedirs(parts_dir, exist_ok=True)
+
+        def save_manifest():
+            tmp_path = manifest_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, manifest_path)
+
+        part_paths = [os.path.join(parts_dir, f'part_{i:05d}.{part_ext}') for i in range(parts)]
+        # A part only counts as done if its file is still there with the size recorded for it.
+        done = {int(i): n for i, n in manifest['done'].items()
+                if os.path.exists(part_paths[int(i)]) and os.path.getsize(part_paths[int(i)]) == n[1]}
+        manifest['done'] = {str(i): n for i, n in done.items()}
+        frames_done = sum(n[0] for n in done.values())
+        if done:
+            log(f"[VideoEngine] Resuming export: {len(done)}/{parts} parts ({frames_done} frames) already rendered")
+        reporter = make_reporter(total_frames)
+        reporter.base_frames = frames_done
+        reporter.update(frames_done, force=True)
+
+        class _PartProgress:
+            # Stands in for the progress queue _export_segment reports to.
+            def put(self, item):
+                if control:
+                    control.checkpoint()
+                reporter.update(frames_done + item[1])
+
+        explicit_end = any(render_opts['range_opts'][k] is not None for k in ('end_time', 'end_frame'))
+        for i in range(parts):
+            if i in done:
+                continue
+            part_start = start + i * checkpoint_frames * stride
+            part_end = start + (i + 1) * checkpoint_frames * stride if i < parts - 1 else (end if explicit_end else None)
+            try:
+                written = _export_segment(input_path, part_paths[i], part_ext, fps, size, part_start, part_end, stride,
+                                          part_opts, i, _PartProgress())
+            except ExportCancelled:
+                if os.path.exists(part_paths[i]):
+                    os.remove(part_paths[i])
+                raise
+            expected = min(checkpoint_frames, total_frames - i * checkpoint_frames)
+            if i < parts - 1 and written != expected:
+                print(f"[VideoEngine] Part {i} failed: wrote {written}/{expected} frames")
+                return False
+            frames_done += written
+            manifest['done'][str(i)] = [written, os.path.getsize(part_paths[i])]
+            save_manifest()
+        if lossless:
+            log(f"[VideoEngine] Encoding {parts} lossless parts into {output_path} (install ffmpeg to join by stream copy)")
+        _join_segments(part_paths, output_path, ext, fps, size, render_opts['encoder_opts'], lossless)
+        reporter.finish()
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        return True
+
+    def _export_fanout(self, jobs, progress_callback=None, progress_sinks=None, control=None):
+        """Decode the shared input once and feed every frame to one plan/encoder chain per job.
+
+        Each chain is built exactly as export_video would build it, so outputs
+        match standalone exports. A chain that fails is dropped without stopping
+        the others. Returns one bool per job.
+        """
+        input_path = jobs[0]['input_path']
+        results = [False] * len(jobs)
+        cap = cv2.VideoCapture(input_path)
+        if not cap.isOpened():
+            print(f"[VideoEngine] Failed to open input video: {input_path}")
+            return results
+        fps = cap.get(cv2.CAP_PROP_FPS) or 24
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        chains = []
+        for idx, job in enumerate(jobs):
+            settings = {**_EXPORT_DEFAULTS, **job}
+            log = (lambda *args, **kwargs: None) if settings['quiet'] else print
+            try:
+                size = resolve_resolution(settings['resolution'])
+                output_path, ext = _output_path_for(settings['output_path'], settings['fmt'])
+                out = open_encoder(output_path, fps, size, ext, **_encoder_opts(**settings))
+                plan = plan_frame_ops(cap, size, compile_effects(settings['effect'], settings['brightness']),
+                                      settings['fit'], settings['pad_color'])
+            except Exception as e:
+                print(f"[VideoEngine] Export failed: {e}")
+                continue
+            log(f"[VideoEngine] Frame plan: {plan.describe()}; encoder: {out.name} -> {output_path}")
+            # One terminal bar per shared decode; the rest of the group reports silently.
+            lead = not chains
+            reporter = self._make_reporter(total_frames, output_path, progress_callback,
+                                           settings['quiet'] or not lead, progress_sinks if lead else None,
+                                           settings['progress_log'], settings['progress_interval'])
+            chains.append({'index': idx, 'plan': plan, 'out': out, 'reporter': reporter, 'buffer': _frame_buffer(size),
+                           'output_path': output_path, 'log': log, 'lead': lead})
+        frame_idx = 0
+        read_buffer = _frame_buffer((int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))))
+        try:
+            while chains:
+                if control:
+                    try:
+                        control.checkpoint()
+                    except ExportCancelled:
+                        for chain in chains:
+                            self._release_quietly(chain['out'])
+                            if os.path.exists(chain['output_path']):
+                                os.remove(chain['output_path'])
+                        print(f"[VideoEngine] Export cancelled: {input_path}")
+                        return results
+                ret, frame = cap.read(read_buffer)
+                if not ret:
+                    break
+                frame_idx += 1
+                for chain in list(chains):
+                    try:
+                        chain['out'].write(chain['plan'].apply(frame, out=chain['buffer']))
+                        chain['reporter'].update(frame_idx)
+                    except Exception as e:
+                        print(f"[VideoEngine] Export failed for {chain['output_path']}: {e}")
+                        chains.remove(chain)
+                        self._release_quietly(chain['out'])
+        finally:
+            cap.release()
+        for chain in chains:
+            try:
+                chain['out'].release()
+            except Exception as e:
+                print(f"[VideoEngine] Export failed for {chain['output_path']}: {e}")
+                continue
+            chain['reporter'].finish()
+            if not chain['lead']:
+                chain['log'](f"Export complete! Output saved to: {chain['output_path']}")
+            results[chain['index']] = True
+        return results
+
+    @staticmethod
+    def _release_quietly(out):
+        try:
+            out.release()
+        except Exception:
+            pass
+
+    def batch_export(self, jobs, progress_callback=None, parallel=False, workers=None, quiet=False, fanout=False, cache=None,
+                     on_job_done=None, profile_dir=None, control=None):
+        """Export every job; returns one bool per job in job order.
+
+        parallel runs tasks in a process pool of `workers` processes (default:
+        CPU count). fanout groups jobs that share an input_path so the source is
+        decoded once for the whole group. cache (an ExportCache, a cache directory,
+        or True for export_cache.default_cache_dir()) skips jobs whose input and
+        parameters were rendered before;
+        identical jobs in the same batch are rendered once either way when caching.
+        on_job_done(index, ok) is called as each job finishes.
+        profile_dir collects a Chrome trace per rendered job (profiled jobs run on
+        their own, never fanned out) plus batch.trace.json merging all of them;
+        per-job stage summaries go to last_batch_report['profiles'].
+        control (a progress.ExportControl) pauses or cancels a serial batch: the
+        running job stops inside its frame loop and the remaining jobs are
+        skipped. Parallel batches cannot be paused or cancelled.
+        """
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+            trace_paths = [os.path.join(profile_dir, f'job_{idx:03d}.trace.json') for idx in range(len(jobs))]
+            for path in trace_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            results = self.batch_export([{**job, 'profile': path} for job, path in zip(jobs, trace_paths)],
+                                        progress_callback, parallel, workers, quiet, fanout, cache, on_job_done,
+                                        control=control)
+            batch_trace = os.path.join(profile_dir, 'batch.trace.json')
+            report = self.last_batch_report or {}
+            report['profiles'] = merge_traces([path for path in trace_paths if os.path.exists(path)], batch_trace)
+            self.last_batch_report = report
+            if not quiet:
+                print(f"[VideoEngine] Batch trace written to {batch_trace}")
+            return results
+        if not cache:
+            return self._render_jobs(jobs, progress_callback, parallel, workers, quiet, fanout, on_job_done, control)
+        if not isinstance(cache, ExportCache):
+            cache = ExportCache(None if cache is True else cache)
+        log = (lambda *args, **kwargs: None) if quiet else print
+        hits, misses = cache.hits, cache.misses
+        results = [False] * len(jobs)
+        keys = [cache.job_key(job, _normalize_job) for job in jobs]
+        output_paths = [_output_path_for(job.get('output_path', ''), job.get('fmt', 'mp4'))[0] for job in jobs]
+        leaders = {}
+        followers = []
+        to_render = []
+        for idx, key in enumerate(keys):
+            if key is None:
+                to_render.append(idx)
+                continue
+            if key in leaders:
+                followers.append((idx, leaders[key]))
+                continue
+            cached_path = cache.lookup(key)
+            if cached_path:
+                try:
+                    action = cache.materialize(key, cached_path, output_paths[idx])
+                    log(f"[VideoEngine] Cache hit ({action}): {output_paths[idx]}")
+                    results[idx] = True
+                    leaders[key] = idx
+                    if on_job_done:
+                        on_job_done(idx, True)
+                    continue
+                except OSError as e:
+                    print(f"[VideoEngine] Cache copy failed, rendering instead: {e}")
+            leaders[key] = idx
+            to_render.append(idx)
+        rendered = self._render_jobs([jobs[idx] for idx in to_render], progress_callback, parallel, workers, quiet, fanout,
+                                     (lambda i, ok: on_job_done(to_render[i], ok)) if on_job_done else None, control)
+        for idx, ok in zip(to_render, rendered):
+            results[idx] = ok
+            if ok and keys[idx] is not None:
+                try:
+                    cache.store(keys[idx], output_paths[idx], jobs[idx].get('input_path'))
+                except OSError as e:
+                    print(f"[VideoEngine] Could not cache {output_paths[idx]}: {e}")
+        for idx, leader in followers:
+            if results[leader]:
+                try:
+                    shutil.copyfile(output_paths[leader], output_paths[idx])
+                    results[idx] = True
+                    log(f"[VideoEngine] Duplicate of job {leader}, copied: {output_paths[idx]}")
+                except OSError as e:
+                    print(f"[VideoEngine] Copy failed for {output_paths[idx]}: {e}")
+            if on_job_done:
+                on_job_done(idx, results[idx])
+        report = self.last_batch_report or {}
+        report['cache'] = {'hits': cache.hits - hits, 'misses': cache.misses - misses,
+                           'collapsed': len(followers), 'rendered': len(to_render)}
+        self.last_batch_report = report
+        log(f"[VideoEngine] Export cache: {report['cache']['hits']} hits, {report['cache']['misses']} misses, "
+            f"{len(followers)} duplicate jobs collapsed, {len(to_render)} rendered")
+        return results
+
+    def _render_jobs(self, jobs, progress_callback=None, parallel=False, workers=None, quiet=False, fanout=False, on_job_done=None,
+                     control=None):
+        tasks = _group_jobs(jobs) if fanout else [[idx] for idx in range(len(jobs))]
+        if parallel:
+            if control:
+                print("[VideoEngine] Parallel batches cannot be paused or cancelled")
+            return self._batch_export_parallel(jobs, tasks, progress_callback, workers, quiet, on_job_done)
+        log = (lambda *args, **kwargs: None) if quiet else print
+        results = [False] * len(jobs)
+        start = time.perf_counter()
+        for position, task in enumerate(tasks):
+            if control:
+                try:
+                    control.checkpoint()
+                except ExportCancelled:
+                    log(f"[VideoEngine] Batch cancelled; skipped {sum(len(t) for t in tasks[position:])} jobs")
+                    break
+            for idx in task:
+                log(f"\nBatch exporting: {jobs[idx].get('input_path')} -> {jobs[idx].get('output_path')}")
+            if len(task) == 1:
+                results[task[0]] = self.export_video(progress_callback=progress_callback, control=control,
+                                                     **{'quiet': quiet, **jobs[task[0]]})
+            else:
+                oks = self._export_fanout([{'quiet': quiet, **jobs[idx]} for idx in task], progress_callback,
+                                          control=control)
+                for idx, ok in zip(task, oks):
+                    results[idx] = ok
+            if on_job_done:
+                for idx in task:
+                    on_job_done(idx, results[idx])
+        self.last_batch_report = {'mode': 'serial', 'workers': 1, 'jobs': len(jobs), 'tasks': len(tasks),
+                                  'wall_time': time.perf_counter() - start}
+        return results
+
+    def _batch_export_parallel(self, jobs, tasks, progress_callback=None, workers=None, quiet=False, on_job_done=None):
+        log = (lambda *args, **kwargs: None) if quiet else print
+        workers = max(1, min(workers or os.cpu_count() or 1, len(tasks) or 1))
+        start = time.perf_counter()
         for job in jobs:
-            result = self.export_video(progress_callback=progress_callback, **job)
-            results.append(result)
+            log(f"Batch exporting: {job.get('input_path')} -> {job.get('output_path')}")
+        def task_done(task_index, outcome, error):
+            oks = outcome[0] if error is None else [False] * len(tasks[task_index])
+            for idx, ok in zip(tasks[task_index], oks):
+                on_job_done(idx, ok)
+
+        # Jobs in a fan-out group report their frames times the group size.
+        totals = [len(task) * _estimate_frames(jobs[task[0]]) for task in tasks] if progress_callback else None
+        outcomes = _run_in_pool(run_export_group, [([jobs[idx] for idx in task],) for task in tasks],
+                                workers, progress_callback, task_done if on_job_done else None, totals)
+        results = [False] * len(jobs)
+        task_times = []
+        for task_index, (outcome, error) in enumerate(outcomes):
+            if error is not None:
+                print(f"[VideoEngine] Task {task_index} crashed: {error}")
+                outcome = ([False] * len(tasks[task_index]), 0.0)
+            for idx, ok in zip(tasks[task_index], outcome[0]):
+                results[idx] = ok
+            task_times.append(outcome[1])
+        wall_time = time.perf_counter() - start
+        # Task times are measured while tasks compete for the CPU, so their sum is not what a
+        # serial batch would take; it only says how busy the workers were (benchmark.py
+        # batch-parallel measures the real serial baseline).
+        task_time_total = sum(task_times)
+        utilization = task_time_total / (wall_time * workers) if wall_time else 0
+        self.last_batch_report = {'mode': 'parallel', 'workers': workers, 'jobs': len(jobs), 'tasks': len(tasks),
+                                  'wall_time': wall_time, 'task_time_total': task_time_total,
+                                  'worker_utilization': utilization, 'task_times': task_times}
+        log(f"[VideoEngine] Batch of {len(jobs)} jobs ({len(tasks)} tasks) on {workers} workers: "
+            f"{wall_time:.2f}s wall, {task_time_total:.2f}s summed task time ({utilization:.0%} worker utilization)")
         return results
 
-    def batch_export_from_json(self, json_path):
+    def batch_export_from_json(self, json_path, progress_callback=None, parallel=False, workers=None, quiet=False, fanout=True, cache=False,
+                               resume=False, profile_dir=None, on_job_done=None, control=None):
+        """Run the jobs in a JSON file.
+
+        With resume=True, finished jobs are recorded in <json_path>.state.json as
+        they complete; a rerun skips jobs whose parameters and output are
+        unchanged, and the remaining jobs run as resumable exports so a job that
+        was interrupted picks up at its last checkpoint.
+        """
         import json
         with open(json_path, 'r') as f:
             jobs = json.load(f)
-        results = []
-        for job in jobs:
-            print(f"\nBatch exporting: {job.get('input_path')} -> {job.get('output_path')}")
-            result = self.export_video(**job)
-            results.append(result)
+        if not resume:
+            return self.batch_export(jobs, progress_callback=progress_callback, parallel=parallel, workers=workers,
+                                     quiet=quiet, fanout=fanout, cache=cache, profile_dir=profile_dir,
+                                     on_job_done=on_job_done, control=control)
+        log = (lambda *args, **kwargs: None) if quiet else print
+        state_path = json_path + '.state.json'
+        state = {}
+        if os.path.exists(state_path):
+            with open(state_path, 'r') as f:
+                state = json.load(f)
+        results = [False] * len(jobs)
+        pending = []
+        for idx, job in enumerate(jobs):
+            entry = state.get(str(idx))
+            output_path = _output_path_for(job.get('output_path', ''), job.get('fmt', 'mp4'))[0]
+            if (entry and entry['digest'] == _job_digest(job) and os.path.exists(output_path)
+                    and os.path.getsize(output_path) == entry['size']):
+                results[idx] = True
+            else:
+                pending.append(idx)
+        if len(pending) < len(jobs):
+            log(f"[VideoEngine] Resuming batch: {len(jobs) - len(pending)}/{len(jobs)} jobs already complete")
+
+        def job_done(i, ok):
+            idx = pending[i]
+            if on_job_done:
+                on_job_done(idx, ok)
+            if not ok:
+                return
+            output_path = _output_path_for(jobs[idx].get('output_path', ''), jobs[idx].get('fmt', 'mp4'))[0]
+            state[str(idx)] = {'digest': _job_digest(jobs[idx]), 'size': os.path.getsize(output_path)}
+            tmp_path = state_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, state_path)
+
+        oks = self.batch_export([{'resumable': True, **jobs[idx]} for idx in pending], progress_callback=progress_callback,
+                                parallel=parallel, workers=workers, quiet=quiet, fanout=fanout, cache=cache,
+                                on_job_done=job_done, profile_dir=profile_dir, control=control)
+        for idx, ok in zip(pending, oks):
+            results[idx] = ok
+        if all(results) and os.path.exists(state_path):
+            os.remove(state_path)
         return results
 
     def save_export_preset(self, preset_path, settings):
         import json
+        encoder = settings.get('encoder', 'auto')
+        if encoder != 'auto' and encoder not in ENCODERS:
+            raise ValueError(f"Unknown encoder backend in preset: {encoder}")
         with open(preset_path, 'w') as f:
             json.dump(settings, f, indent=2)
         print(f"Export preset saved to {preset_path}")
@@ -95,16 +1065,86 @@ class VideoEngine:
         print(f"Loaded export preset from {preset_path}")
         return settings
 
+_EXPORT_DEFAULTS = {name: param.default for name, param in inspect.signature(VideoEngine.export_video).parameters.items()
+                    if param.default is not inspect.Parameter.empty}
+# Options that need their own decode loop (segments, pipeline, ...) keep a job out of a fan-out group.
+_FANOUT_OPTIONS = {'input_path', 'output_path', 'resolution', 'fmt', 'bitrate', 'effect', 'brightness',
+                   'fit', 'pad_color', 'quiet', 'progress_log', 'progress_interval',
+                   'encoder', 'codec', 'encoder_preset', 'crf', 'encoder_threads'}
+
+
+def _normalize_job(job):
+    # Canonical output-affecting parameters, so equivalent spellings share a cache key.
+    settings = {**_EXPORT_DEFAULTS, **job}
+    settings['resolution'] = list(resolve_resolution(settings['resolution']))
+    settings['fmt'] = str(settings['fmt']).lower()
+    settings['effect'] = parse_effects(settings['effect'], settings.pop('brightness'))
+    settings['pad_color'] = list(settings['pad_color'])
+    settings['encoder'] = resolve_encoder(settings['encoder'])
+    if settings['encoder'] == 'opencv':
+        for option in ('codec', 'encoder_preset', 'crf', 'bitrate', 'encoder_threads'):
+            settings.pop(option)
+    return settings
+
+
+def _job_digest(job):
+    import hashlib
+    import json
+    return hashlib.sha256(json.dumps(job, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _group_jobs(jobs):
+    """Group job indices by input_path; jobs that cannot share a decode stay alone."""
+    tasks = []
+    by_input = {}
+    for idx, job in enumerate(jobs):
+        if not set(job) <= _FANOUT_OPTIONS or 'input_path' not in job:
+            tasks.append([idx])
+            continue
+        key = os.path.abspath(job['input_path'])
+        if key not in by_input:
+            by_input[key] = [idx]
+            tasks.append(by_input[key])
+        else:
+            by_input[key].append(idx)
+    return tasks
+
+
 if __name__ == "__main__":
     video = VideoEngine()
     # Example: Export with effect and brightness
     video.export_video('input.mp4', 'output_gray', effect='grayscale')
     video.export_video('input.mp4', 'output_invert', effect='invert')
     video.export_video('input.mp4', 'output_bright', brightness=1.5)
+    # Example: Split one long export into segments rendered on every core
+    # video.export_video('input.mp4', 'output_segmented', segments='auto')
+    # Example: Skip re-rendering frames identical to the previous one (slides, screen recordings)
+    # video.export_video('input.mp4', 'output_static', reuse_static=True)
+    # Example: Live preview; poll video.preview_slot.take() from another thread while exporting
+    # video.export_video('input.mp4', 'output_preview', live_preview=True, preview_fps=10)
+    # Example: Transform frames in blocks of 16 to amortize per-frame overhead at low resolutions
+    # video.export_video('input.mp4', 'output_batched', resolution='480p', batch_size=16)
+    # Example: Overlap decode/transform/encode on threads for a single job
+    # video.export_video('input.mp4', 'output_pipelined', pipeline=True, transform_workers=2)
     # Example: Batch export from JSON
     # video.batch_export_from_json('batch_jobs.json')
+    # Example: Parallel batch export across all CPU cores
+    # video.batch_export_from_json('batch_jobs.json', parallel=True)
+    # Example: Reuse earlier renders of identical jobs (opt-in; see export_cache.default_cache_dir)
+    # video.batch_export_from_json('batch_jobs.json', cache=True)
+    # Example: Export a 1-second clip starting at 1s, keeping every 2nd frame
+    # video.export_video('input.mp4', 'output_clip', start_time=1.0, end_time=2.0, frame_stride=2)
+    # Example: Checkpointed export; rerun the same call after an interruption to continue
+    # video.export_video('input.mp4', 'output_long', resumable=True, checkpoint_frames=500)
+    # video.batch_export_from_json('jobs.json', resume=True)
+    # Example: Per-stage timings and a Chrome trace (open in chrome://tracing or Perfetto)
+    # video.export_video('input.mp4', 'output_profiled', profile='output_profiled.trace.json')
+    # video.batch_export_from_json('jobs.json', profile_dir='profiles')
     # Example: Save/load export preset
-    preset = {'resolution': '720p', 'fmt': 'avi', 'effect': 'grayscale'}
+    preset = {'resolution': '720p', 'fmt': 'avi', 'effect': 'grayscale',
+              'encoder': 'ffmpeg', 'codec': 'libx264', 'encoder_preset': 'veryfast', 'crf': 23, 'encoder_threads': 0}
     video.save_export_preset('export_preset.json', preset)
     loaded = video.load_export_preset('export_preset.json')
     print('Loaded preset:', loaded)
+    # Example: Export with the loaded preset (encoder backend included)
+    # video.export_video('input.mp4', 'output_preset', **loaded)